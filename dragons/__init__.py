@@ -1,7 +1,40 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import importlib
 import logging
 
-from . import meraxes, munge, nbody, plotutils
 from ._version import version as __version__
+
+# Submodules are only imported when first accessed (e.g. `dragons.meraxes`) so
+# that importing dragons doesn't pull in the whole HDF5/matplotlib stack.
+_SUBMODULES = frozenset(("meraxes", "munge", "nbody", "plotutils"))
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
+
+
+def setup_logging(level="INFO"):
+    """Attach a coloured console handler to the dragons logger.
+
+    Nothing is configured on import; scripts that want to see the log
+    messages should call this explicitly.
+
+    Parameters
+    ----------
+    level : str or int
+        Logging level for the dragons logger.  (default: "INFO")
+    """
+
+    import coloredlogs
+
+    coloredlogs.install(level=level, logger=logging.getLogger(__name__))
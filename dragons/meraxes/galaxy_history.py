@@ -1,16 +1,144 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-"""Generate the full (first progenitor line) history of a galaxy."""
+"""Generate the full (first progenitor line) history of a galaxy (or many
+galaxies)."""
 
 from ..munge import ndarray_to_dataframe
-from .io import read_gals, read_firstprogenitor_indices, read_descendant_indices
+from .io import (
+    _galaxy_dtype,
+    read_gals,
+    read_gals_into,
+    read_firstprogenitor_index,
+    read_firstprogenitor_indices,
+    read_descendant_index,
+    read_descendant_indices,
+)
 from tqdm import tqdm
 
+import h5py as h5
 import numpy as np
+import warnings
 
 
-def galaxy_history(fname, gal_id, snapshot, future_snapshot=-1, pandas=False, props=None):
+def _open_master_file(fname, rdcc_nbytes, mdc_nbytes):
+    """Open the master file with HDF5 caches sized for many small reads
+    scattered across the snapshot groups."""
+
+    fin = h5.File(fname, "r", rdcc_nbytes=rdcc_nbytes)
+
+    if mdc_nbytes is not None:
+        # Fix the metadata cache at the requested size so that the group and
+        # dataset metadata of every snapshot we visit stays resident.
+        config = fin.id.get_mdc_config()
+        config.set_initial_size = True
+        config.initial_size = config.max_size = mdc_nbytes
+        config.min_size = min(config.min_size, mdc_nbytes)
+        config.incr_mode = config.flash_incr_mode = config.decr_mode = 0
+        fin.id.set_mdc_config(config)
+
+    return fin
+
+
+def _cast_dtype(dtype, dtype_cast):
+    """Return a copy of the compound `dtype` with the fields in `dtype_cast`
+    changed to the given types (keeping the shape of any array fields)."""
+
+    fields = []
+    for name in dtype.names:
+        field_dtype = dtype.fields[name][0]
+        if name in dtype_cast:
+            field_dtype = np.dtype((dtype_cast[name], field_dtype.shape))
+        fields.append((name, field_dtype))
+
+    return np.dtype(fields)
+
+
+def _find_galaxy(ids, gal_id):
+    """Return the index of `gal_id` in the array of galaxy `ids`.
+
+    Meraxes IDs are often (but not always) sorted, so we first try a binary
+    search and only fall back to a full scan if that doesn't find the galaxy.
+    """
+
+    ind = np.searchsorted(ids, gal_id)
+    if ind < ids.shape[0] and ids[ind] == gal_id:
+        return ind
+
+    return np.flatnonzero(ids == gal_id)[0]
+
+
+def _walk_progenitors(fin, snapshot, ind, cache):
+    """Follow the first progenitor line of the galaxy with index `ind` in
+    `snapshot` back in time.
+
+    Returns a dict of {snapshot: index} for each earlier snapshot the galaxy
+    is present in.
+    """
+
+    inds = {}
+    ind = read_firstprogenitor_index(fin, snapshot, ind, cache) if snapshot > 0 else -1
+
+    if ind == -1:
+        return inds
+
+    for snap in range(snapshot - 1, -1, -1):
+        inds[snap] = ind
+        if snap > 0:
+            ind = read_firstprogenitor_index(fin, snap, ind, cache)
+            if ind == -1:
+                break
+
+    return inds
+
+
+def _walk_descendants(fin, snapshot, future_snapshot, ind, cache):
+    """Follow the descendant line of the galaxy with index `ind` in
+    `snapshot` forward in time up to `future_snapshot`.
+
+    Returns a dict of {snapshot: index} for each later snapshot the galaxy is
+    present in.
+    """
+
+    inds = {}
+
+    for snap in range(snapshot + 1, future_snapshot + 1):
+        ind = read_descendant_index(fin, snap - 1, ind, cache)
+        if ind == -1:
+            break
+        inds[snap] = ind
+
+    return inds
+
+
+def _find_merger(fin, inds, snapshot, future_snapshot, cache):
+    """Return the first snapshot (before `future_snapshot`) at which the
+    galaxy traced by `inds` (a dict of {snapshot: index}, starting at
+    `snapshot`) is not the first progenitor of its descendant, i.e. at which
+    it merged into another galaxy (-1 if it never does).
+
+    This is done after the walk so that we can stop reading first progenitor
+    indices as soon as the merger is found.
+    """
+
+    for snap in range(snapshot + 1, min(future_snapshot, max(inds) + 1)):
+        if read_firstprogenitor_index(fin, snap, inds[snap], cache) != inds[snap - 1]:
+            return snap
+
+    return -1
+
+
+def galaxy_history(
+    fname,
+    gal_id,
+    snapshot,
+    future_snapshot=-1,
+    pandas=False,
+    props=None,
+    rdcc_nbytes=128 * 1024 ** 2,
+    mdc_nbytes=128 * 1024 ** 2,
+    dtype_cast=None,
+):
 
     """ Read in the full first progenitor history of a galaxy at a given final
     snapshot.
@@ -36,11 +164,27 @@ def galaxy_history(fname, gal_id, snapshot, future_snapshot=-1, pandas=False, pr
     pandas : bool
         Return panads dataframe.  (default = False)
 
+    rdcc_nbytes : int
+        Size of the HDF5 raw data chunk cache in bytes.  (default: 128 MiB)
+
+    mdc_nbytes : int
+        Size of the HDF5 metadata cache in bytes.  If `None` then the HDF5
+        default (adaptive) cache is used.  (default: 128 MiB)
+
+    dtype_cast : dict
+        Types to store some of the properties as in the returned history, e.g.
+        `{"StellarMass": np.float32}`.  The conversion is done by HDF5 as the
+        galaxies are read.  Note that downcasting (e.g. double to single
+        precision) loses precision and range.  (default: None [store
+        properties with their native types])
+
     Returns
     -------
     history : ndarray or DataFrame
         The requested first progenitor history.  If future=True then the
-        ndarray includes the future of this object.
+        ndarray includes the future of this object.  Snapshots in which the
+        galaxy is not present are left zeroed (a `RuntimeWarning` is issued
+        if the galaxy has no progenitors at all).
 
     merged_snapshot : int
         If `future_snapshot != -1` then the snapshot at which the galaxy
@@ -48,47 +192,178 @@ def galaxy_history(fname, gal_id, snapshot, future_snapshot=-1, pandas=False, pr
         then the galaxy remains until `future_snapshot.`
     """
 
-    gals = read_gals(fname, snapshot=snapshot, props=props, pandas=False)
+    # Open the master file once and reuse the handle for every read below
+    # rather than re-opening it for each snapshot.
+    with _open_master_file(fname, rdcc_nbytes, mdc_nbytes) as fin:
+        # Only the IDs are needed to locate the galaxy; the requested
+        # properties are then read straight into its row of the history.
+        ids = read_gals(fin, snapshot=snapshot, props=["ID"], pandas=False)["ID"]
+        start_ind = _find_galaxy(ids, gal_id)
 
-    start_ind = np.where(gals["ID"] == gal_id)[0][0]
-    merged_snapshot = -1
+        if future_snapshot == -1:
+            future_snapshot = snapshot
+        gal_dtype = _galaxy_dtype(fin["Snap%03d" % snapshot], props)
+        if dtype_cast:
+            gal_dtype = _cast_dtype(gal_dtype, dtype_cast)
+        history = np.zeros(future_snapshot + 1, dtype=gal_dtype)
 
-    if future_snapshot == -1:
-        future_snapshot = snapshot
-    history = np.zeros(future_snapshot + 1, dtype=gals.dtype)
+        read_gals_into(fin, history[snapshot : snapshot + 1], snapshot, indices=[start_ind])
 
-    history[snapshot] = gals[start_ind]
-    ind = read_firstprogenitor_indices(fname, snapshot)[start_ind]
+        # Find the index of the galaxy in every other snapshot it is present
+        # in.  We only pay for walking the descendant line if it was asked for.
+        # Resolved HDF5 handles and core offsets are shared between all of
+        # the index reads of both walks (and the galaxy reads below).
+        cache = {}
+        inds = _walk_progenitors(fin, snapshot, start_ind, cache)
+        if not inds:
+            warnings.warn("Galaxy {:d} has no progenitors!".format(gal_id), RuntimeWarning)
+        if future_snapshot != snapshot:
+            future_inds = _walk_descendants(fin, snapshot, future_snapshot, start_ind, cache)
+            merged_snapshot = _find_merger(fin, {snapshot: start_ind, **future_inds}, snapshot, future_snapshot, cache)
+            inds.update(future_inds)
 
-    if ind == -1:
-        raise Warning("This galaxy has no progenitors!")
+        # Finally, read the galaxy at each of these snapshots straight into its
+        # row of the history array.  Snapshots are visited in ascending order
+        # so that the reads walk forward through the file, which is what OS
+        # and filesystem read-ahead is tuned for.
+        for snap in tqdm(sorted(inds)):
+            read_gals_into(fin, history[snap : snap + 1], snap, indices=[inds[snap]], cache=cache)
 
-    for snap in tqdm(list(range(snapshot - 1, -1, -1))):
-        history[snap] = read_gals(fname, snapshot=snap, pandas=False, props=props, indices=[ind])
-        if snap>0:
-            ind = read_firstprogenitor_indices(fname, snap)[ind]
-            if ind == -1:
+    if pandas:
+        history = ndarray_to_dataframe(history, copy=False)
+
+    if future_snapshot == snapshot:
+        return history
+    else:
+        return history, merged_snapshot
+
+
+def galaxy_histories(
+    fname,
+    gal_ids,
+    snapshot,
+    future_snapshot=-1,
+    props=None,
+    rdcc_nbytes=128 * 1024 ** 2,
+    mdc_nbytes=128 * 1024 ** 2,
+    dtype_cast=None,
+):
+
+    """ Read in the full first progenitor histories of many galaxies at a given
+    final snapshot.
+
+    This is equivalent to calling `galaxy_history` for each galaxy, but the
+    progenitor and descendant indices of each snapshot are only read once and
+    all of the requested galaxies are read from each snapshot together.
+
+    Parameters
+    ----------
+    fname : str
+        Full path to input hdf5 master file.
+
+    gal_ids : array
+        Unique IDs of the target galaxies.
+
+    snapshot : int
+        Snapshot at which the histories are to be traced from.
+
+    props : list
+        A list of galaxy properties requested.  (default: All properties)
+
+    future_snapshot: int
+        Also read in the future of the galaxies up to this snapshot.
+        (default: -1 [don't read in future])
+
+    rdcc_nbytes : int
+        Size of the HDF5 raw data chunk cache in bytes.  (default: 128 MiB)
+
+    mdc_nbytes : int
+        Size of the HDF5 metadata cache in bytes.  If `None` then the HDF5
+        default (adaptive) cache is used.  (default: 128 MiB)
+
+    dtype_cast : dict
+        Types to store some of the properties as in the returned histories.
+        See `galaxy_history`.  (default: None [store properties with their
+        native types])
+
+    Returns
+    -------
+    histories : ndarray
+        Array of shape `(len(gal_ids), future_snapshot + 1)` holding the
+        history of each requested galaxy.  Snapshots in which a galaxy is not
+        present are left zeroed.
+
+    inds : ndarray
+        Array of the same shape giving the index of each galaxy in each
+        snapshot (-1 where it is not present).
+
+    merged_snapshots : ndarray
+        If `future_snapshot != -1` then the snapshot at which each galaxy
+        merged into another is also returned (-1 if it remains until
+        `future_snapshot`).
+    """
+
+    gal_ids = np.atleast_1d(gal_ids)
+    n_gals = gal_ids.shape[0]
+
+    with _open_master_file(fname, rdcc_nbytes, mdc_nbytes) as fin:
+        # Locate all of the galaxies in the starting snapshot at once
+        ids = read_gals(fin, snapshot=snapshot, props=["ID"], pandas=False)["ID"]
+        order = np.argsort(ids)
+        pos = np.searchsorted(ids, gal_ids, sorter=order).clip(max=ids.shape[0] - 1)
+        start_inds = order[pos]
+        missing = ids[start_inds] != gal_ids
+        if missing.any():
+            raise IndexError("Galaxies not found in snapshot {:d}: {}".format(snapshot, gal_ids[missing]))
+
+        if future_snapshot == -1:
+            future_snapshot = snapshot
+
+        inds = np.full((n_gals, future_snapshot + 1), -1, "i4")
+        inds[:, snapshot] = start_inds
+
+        # Walk all of the first progenitor lines back together
+        for snap in range(snapshot, 0, -1):
+            cur = inds[:, snap]
+            present = cur > -1
+            if not present.any():
                 break
+            inds[present, snap - 1] = read_firstprogenitor_indices(fin, snap)[cur[present]]
 
-    if future_snapshot != snapshot:
-        ind = start_ind
-        for snap in tqdm(list(range(snapshot + 1, future_snapshot + 1))):
-            last_ind = ind
-            ind = read_descendant_indices(fname, snap - 1)[ind]
-            if ind == -1:
+        # ...and all of the descendant lines forward, noting the first
+        # snapshot at which each galaxy is not the first progenitor of its
+        # descendant (i.e. it has merged into another galaxy)
+        merged_snapshots = np.full(n_gals, -1, "i4")
+        for snap in range(snapshot + 1, future_snapshot + 1):
+            last = inds[:, snap - 1]
+            present = last > -1
+            if not present.any():
                 break
+            inds[present, snap] = read_descendant_indices(fin, snap - 1)[last[present]]
 
+            # only galaxies that haven't already merged need checking
             if snap < future_snapshot:
-                fp = read_firstprogenitor_indices(fname, snap)[ind]
-                if fp != last_ind and merged_snapshot == -1:
-                    merged_snapshot = snap
+                check = (inds[:, snap] > -1) & (merged_snapshots == -1)
+                if check.any():
+                    merged = read_firstprogenitor_indices(fin, snap)[inds[check, snap]] != last[check]
+                    merged_snapshots[np.flatnonzero(check)[merged]] = snap
 
-            history[snap] = read_gals(fname, snapshot=snap, pandas=False, props=props, indices=[ind])
+        gal_dtype = _galaxy_dtype(fin["Snap%03d" % snapshot], props)
+        if dtype_cast:
+            gal_dtype = _cast_dtype(gal_dtype, dtype_cast)
+        histories = np.zeros((n_gals, future_snapshot + 1), dtype=gal_dtype)
 
-    if pandas:
-        history = ndarray_to_dataframe(history)
+        # Read every galaxy needed from each snapshot in one go and scatter
+        # them into the histories
+        for snap in tqdm(range(future_snapshot + 1)):
+            present = inds[:, snap] > -1
+            if not present.any():
+                continue
+            unique_inds, inverse = np.unique(inds[present, snap], return_inverse=True)
+            gals = read_gals_into(fin, np.empty(unique_inds.shape[0], dtype=gal_dtype), snap, indices=unique_inds)
+            histories[present, snap] = gals[inverse]
 
     if future_snapshot == snapshot:
-        return history
+        return histories, inds
     else:
-        return history, merged_snapshot
+        return histories, inds, merged_snapshots
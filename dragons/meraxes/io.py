@@ -8,9 +8,11 @@ from ..munge import ndarray_to_dataframe
 import re
 import numpy as np
 import h5py as h5
+from h5py import h5s
 from astropy.table import Table
 import pandas as pd
 import logging
+from contextlib import contextmanager
 from pathlib import PurePath
 
 
@@ -26,6 +28,62 @@ def _check_pandas():
         raise ImportError("The pandas package must be available if" " pandas=True.")
 
 
+@contextmanager
+def _open_or_reuse(fname):
+    """Yield an open Meraxes hdf5 file.
+
+    If `fname` is already an open `h5py.File` it is yielded as is (and left
+    open for the caller), otherwise the file is opened read-only and closed
+    again on exit.
+    """
+    if isinstance(fname, h5.File):
+        yield fname
+    else:
+        with h5.File(fname, "r") as fin:
+            yield fin
+
+
+def _read_rows(dset, idx, out):
+    """Read the rows `idx` (in ascending order) of `dset` directly into the
+    contiguous array `out`.
+
+    This goes through the low-level h5py API, which avoids the comparatively
+    large overhead of high-level fancy indexing.  A single row is read with a
+    hyperslab selection and multiple rows are coalesced into one point
+    selection, so there is only ever one read call per dataset.
+    """
+    fspace = dset.id.get_space()
+    if len(idx) == 1:
+        fspace.select_hyperslab((int(idx[0]),), (1,))
+    else:
+        fspace.select_elements(np.asarray(idx, dtype="u8").reshape(-1, 1))
+    mspace = h5s.create_simple((len(idx),))
+    dset.id.read(mspace, fspace, out)
+
+
+def _galaxy_dtype(snap_group, props=None):
+    """Return the dtype of the galaxies in `snap_group`, restricted to the
+    properties `props` (default: all properties).
+
+    The restricted dtype is packed so that it only holds the requested
+    properties.  Reading into it makes HDF5 convert just these members of
+    the stored compound type, rather than moving every galaxy property and
+    discarding most of them afterwards.
+    """
+
+    # every core has a Galaxies dataset (even if it is empty) with the same
+    # compound type, so the first one is as good as any
+    gal_dtype = snap_group["Core0/Galaxies"].dtype
+
+    if props is not None:
+        for p in props:
+            if p not in gal_dtype.fields:
+                raise ValueError("Field {:s} does not appear in this type.".format(p))
+        gal_dtype = np.dtype([(p, gal_dtype.fields[p][0]) for p in props])
+
+    return gal_dtype
+
+
 def set_little_h(h=None):
 
     """ Set the value of little h to be used by all future meraxes.io calls
@@ -33,10 +91,10 @@ def set_little_h(h=None):
 
     Parameters
     ----------
-    h : float or str
-        Little h value.  If a filename is passed as a string, then little h
-        will be set to the simulation value read from that file.
-        (default: None)
+    h : float, str or h5py.File
+        Little h value.  If a filename (or an open Meraxes hdf5 file) is
+        passed, then little h will be set to the simulation value read from
+        that file.  (default: None)
 
     Returns
     -------
@@ -44,7 +102,7 @@ def set_little_h(h=None):
         Little h value.
     """
 
-    if type(h) is str or isinstance(h, PurePath):
+    if type(h) is str or isinstance(h, (PurePath, h5.File)):
         h = read_input_params(h)["Hubble_h"]
 
     global __meraxes_h
@@ -60,7 +118,7 @@ def set_little_h(h=None):
 
 
 def read_gals(
-    fname, snapshot=None, props=None, sim_props=False, pandas=False, table=False, h=None, indices=None,
+    fname, snapshot=None, props=None, sim_props=False, pandas=False, table=False, h=None, indices=None, columnar=False,
 ):
 
     """Read in a Meraxes hdf5 output file.
@@ -69,8 +127,8 @@ def read_gals(
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file.
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
 
     snapshot : int
         The snapshot to read in.  (default: last present snapshot - usually
@@ -99,6 +157,11 @@ def read_gals(
         Indices of galaxies to be read.  If `None` then read all galaxies.
         (default = None)
 
+    columnar : bool
+        Output a dict with a contiguous array for each property instead of
+        a structured ndarray.  This is faster to work with if the properties
+        are going to be used one at a time.  (default = False)
+
     Returns
     -------
         An ndarray with the requested galaxies and properties.
@@ -109,144 +172,74 @@ def read_gals(
     if (h is None) and (__meraxes_h is not None):
         h = __meraxes_h
 
-    def __apply_offsets(G, dest_sel, counter):
-        # Deal with any indices that need offsets applied
-        try:
-            G[dest_sel]["CentralGal"] += counter
-        except ValueError:
-            pass
-
     if pandas:
         _check_pandas()
 
     if pandas and table:
         logger.error("Both `pandas` and `table` specified.  Please choose one" " or the other.")
 
-    # Grab the units and hubble conversions information
-    units = read_units(fname)
-
-    # Open the file for reading
-    fin = h5.File(fname, "r")
-
-    # Set the snapshot correctly
-    if snapshot is None:
-        snapshot = -1
-    if snapshot < 0:
-        present_snaps = np.asarray(list(fin.keys()))
-        selection = np.array([(p.find("Snap") == 0) for p in present_snaps])
-        present_snaps = [int(p[4:]) for p in present_snaps[selection]]
-        snapshot = sorted(present_snaps)[snapshot]
+    if columnar and (pandas or table):
+        logger.error("`columnar` can't be combined with `pandas` or `table`.  Please choose one.")
 
-    logger.info("Reading snapshot %d" % snapshot)
+    # Open the file for reading (or reuse the handle we were given)
+    with _open_or_reuse(fname) as fin:
+        # Grab the units information if we are going to need to attach it
+        if pandas or table:
+            units = read_units(fin)
 
-    # Select the group for the requested snapshot.
-    snap_group = fin["Snap%03d" % (snapshot)]
-
-    # How many cores have been used for this run?
-    n_cores = fin.attrs["NCores"][0]
-
-    # Grab the total number of galaxies in this snapshot
-    ngals = snap_group.attrs["NGalaxies"][0]
-
-    if ngals == 0:
-        raise IndexError("There are no galaxies in snapshot {:d}!".format(snapshot))
+        # Set the snapshot correctly
+        if snapshot is None:
+            snapshot = -1
+        if snapshot < 0:
+            present_snaps = np.asarray(list(fin.keys()))
+            selection = np.array([(p.find("Snap") == 0) for p in present_snaps])
+            present_snaps = [int(p[4:]) for p in present_snaps[selection]]
+            snapshot = sorted(present_snaps)[snapshot]
 
-    # Reset ngals to be the number of requested galaxies if appropriate
-    if indices is not None:
-        indices = np.array(indices, "i")
-        indices.sort()
-        ngals = indices.shape[0]
+        logger.info("Reading snapshot %d" % snapshot)
 
-    # Set the galaxy data type
-    gal_dtype = None
-    for i_core in range(n_cores):
-        try:
-            if props is not None:
-                gal_dtype = snap_group["Core%d/Galaxies" % i_core][tuple(props)][0].dtype
-            else:
-                gal_dtype = snap_group["Core%d/Galaxies" % i_core].dtype
-        except IndexError:
-            pass
-        if gal_dtype is not None:
-            break
-
-    # Newer versions of numpy will return a dtype with no fields if we have
-    # only requested one property.  We need to reconstruct a named dtype for
-    # the direct read below.
-    if gal_dtype.names is None:
-        assert len(props) == 1
-        gal_dtype = snap_group["Core%d/Galaxies" % i_core].dtype[props]
-
-    # Create a dataset large enough to hold all of the requested galaxies
-    G = np.empty(ngals, dtype=gal_dtype)
-    logger.info("Allocated %.1f MB" % (G.itemsize * ngals / 1024.0 / 1024.0))
-
-    # Loop through each of the requested groups and read in the galaxies
-    if ngals > 0:
-        counter = 0
-        total_read = 0
-        for i_core in range(n_cores):
-            galaxies = snap_group["Core%d/Galaxies" % i_core]
-            core_ngals = galaxies.size
+        # Select the group for the requested snapshot.
+        snap_group = fin["Snap%03d" % (snapshot)]
 
-            if core_ngals > 0:
-                if indices is None:
-                    dest_sel = np.s_[counter : core_ngals + counter]
-                    galaxies.read_direct(G, dest_sel=dest_sel)
-
-                    __apply_offsets(G, dest_sel, counter)
-                    counter += core_ngals
+        # How many cores have been used for this run?
+        n_cores = fin.attrs["NCores"][0]
 
-                else:
-                    read_ind = (
-                        np.compress((indices >= total_read) & (indices < total_read + core_ngals), indices,)
-                        - total_read
-                    )
+        # Grab the total number of galaxies in this snapshot
+        ngals = snap_group.attrs["NGalaxies"][0]
 
-                    if read_ind.shape[0] > 0:
-                        dest_sel = np.s_[counter : read_ind.shape[0] + counter]
-                        bool_sel = np.zeros(core_ngals, "bool")
-                        bool_sel[read_ind] = True
-                        G[dest_sel] = galaxies[G.dtype.names][bool_sel]
+        if ngals == 0:
+            raise IndexError("There are no galaxies in snapshot {:d}!".format(snapshot))
 
-                        __apply_offsets(G, dest_sel, total_read)
-                        counter += read_ind.shape[0]
+        # Reset ngals to be the number of requested galaxies if appropriate
+        if indices is not None:
+            ngals = len(indices)
 
-                    total_read += core_ngals
+        # Set the galaxy data type
+        gal_dtype = _galaxy_dtype(snap_group, props)
 
-            if counter >= ngals:
-                break
+        # Create a dataset large enough to hold all of the requested galaxies
+        G = np.empty(ngals, dtype=gal_dtype)
+        logger.info("Allocated %.1f MB" % (G.itemsize * ngals / 1024.0 / 1024.0))
 
-    # Print some checking statistics
-    logger.info("Read in %d galaxies." % len(G))
+        # Read in the galaxies (applying any Hubble scalings)
+        read_gals_into(fin, G, snapshot, indices=indices, h=h)
 
-    # Apply any Hubble scalings
-    if h is not None:
-        h = float(h)
-        h_conv = units["HubbleConversions"]
-        logger.info("Scaling galaxy properties to h = %.3f" % h)
-        for p in gal_dtype.names:
-            try:
-                conversion = h_conv[p]
-            except KeyError:
-                logger.warn("Unrecognised galaxy property %s - assuming no " "scaling with Hubble const!" % p)
-            if conversion.lower() != "none":
-                try:
-                    G[p] = eval(conversion, dict(v=G[p], h=h, log10=np.log10, __builtins__={}))
-                except:
-                    logger.error("Failed to parse conversion string `%s` for unit" " %s" % (conversion, p))
+        # Set some run properties
+        if sim_props:
+            properties = read_input_params(fin, h=h)
+            properties["Redshift"] = snap_group.attrs["Redshift"]
 
     # If requested convert the numpy array into a pandas dataframe
     if pandas:
         logger.info("Converting to pandas DataFrame...")
-        G = ndarray_to_dataframe(G)
+        G = ndarray_to_dataframe(G, copy=False)
         regex = re.compile("_\d*$")
         # attach the units to each column
         for k in G.columns:
             try:
                 G[k].unit = units[re.sub(regex, "", k, 1)]
             except KeyError:
-                logger.warn("Unrecognised galaxy property %s - assuming " "dimensionless quantitiy!" % k)
+                logger.warning("Unrecognised galaxy property %s - assuming " "dimensionless quantitiy!" % k)
     # else convert to astropy table and attach units
     elif table:
         logger.info("Converting to astropy Table...")
@@ -255,14 +248,11 @@ def read_gals(
             try:
                 v.unit = units[k]
             except KeyError:
-                logger.warn("Unrecognised galaxy property %s - assuming " "dimensionless quantitiy!" % k)
-
-    # Set some run properties
-    if sim_props:
-        properties = read_input_params(fname, h=h)
-        properties["Redshift"] = snap_group.attrs["Redshift"]
-
-    fin.close()
+                logger.warning("Unrecognised galaxy property %s - assuming " "dimensionless quantitiy!" % k)
+    # else split the records in to a contiguous array for each property (the
+    # fields are only copied if they are interleaved with others)
+    elif columnar:
+        G = {name: np.ascontiguousarray(G[name]) for name in G.dtype.names}
 
     if sim_props:
         return G, properties
@@ -270,13 +260,147 @@ def read_gals(
         return G
 
 
+def read_gals_into(fname, out, snapshot, indices=None, h=None, cache=None):
+
+    """Read Meraxes galaxies directly into a preallocated array.
+
+    This does the actual reading for `read_gals`, but can also be used to fill
+    part of an existing array without any intermediate copies (e.g. a single
+    row of a galaxy history).
+
+    Parameters
+    ----------
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
+
+    out : ndarray
+        The array to read the galaxies into.  The properties read are given by
+        the field names of its dtype and it must have one entry per requested
+        galaxy.  Pass a slice (e.g. `arr[i : i + 1]`) to fill part of a larger
+        array.
+
+    snapshot : int
+        The snapshot to read from.
+
+    indices : list or array
+        Indices of galaxies to be read.  If `None` then read all galaxies.
+        The galaxies are stored in ascending index order.  (default = None)
+
+    h : float
+        Hubble constant (/100) to scale the galaxy properties to.  If
+        `None` then no scaling is made unless `set_little_h` was previously
+        called.  (default = None)
+
+    cache : dict
+        If given along with `indices`, the core layout of the snapshot and the
+        resolved Galaxies datasets are stored in (and reused from) this dict,
+        and only the cores holding the requested galaxies are visited.  Pass
+        the same (initially empty) dict to repeated calls on the same open
+        file, e.g. the one used with `read_firstprogenitor_index`.
+        (default = None)
+
+    Returns
+    -------
+    out : ndarray
+        The input array, now holding the requested galaxies.
+    """
+
+    if (h is None) and (__meraxes_h is not None):
+        h = __meraxes_h
+
+    def __apply_offsets(G, dest_sel, counter):
+        # Deal with any indices that need offsets applied
+        try:
+            G[dest_sel]["CentralGal"] += counter
+        except ValueError:
+            pass
+
+    if indices is not None:
+        indices = np.array(indices, "i")
+        indices.sort()
+
+    ngals = out.shape[0]
+
+    with _open_or_reuse(fname) as fin:
+        snap_group = fin["Snap%03d" % (snapshot)]
+        n_cores = fin.attrs["NCores"][0]
+
+        if ngals > 0 and indices is not None and cache is not None:
+            # Go straight to the cores holding the requested galaxies
+            snap_group, core_counter = _core_layout(fin, snapshot, cache)
+            core_bounds = np.searchsorted(indices, core_counter)
+            for i_core in np.unique(np.searchsorted(core_counter, indices, side="right") - 1):
+                key = (snapshot, "Galaxies", i_core)
+                if key not in cache:
+                    cache[key] = snap_group["Core%d/Galaxies" % i_core]
+
+                dest_sel = np.s_[core_bounds[i_core] : core_bounds[i_core + 1]]
+                _read_rows(cache[key], indices[dest_sel] - core_counter[i_core], out[dest_sel])
+                __apply_offsets(out, dest_sel, core_counter[i_core])
+
+        # Loop through each of the requested groups and read in the galaxies
+        elif ngals > 0:
+            counter = 0
+            total_read = 0
+            for i_core in range(n_cores):
+                galaxies = snap_group["Core%d/Galaxies" % i_core]
+                core_ngals = galaxies.size
+
+                if core_ngals > 0:
+                    if indices is None:
+                        dest_sel = np.s_[counter : core_ngals + counter]
+                        galaxies.read_direct(out, dest_sel=dest_sel)
+
+                        __apply_offsets(out, dest_sel, counter)
+                        counter += core_ngals
+
+                    else:
+                        read_ind = (
+                            np.compress((indices >= total_read) & (indices < total_read + core_ngals), indices,)
+                            - total_read
+                        )
+
+                        if read_ind.shape[0] > 0:
+                            dest_sel = np.s_[counter : read_ind.shape[0] + counter]
+                            _read_rows(galaxies, read_ind, out[dest_sel])
+
+                            __apply_offsets(out, dest_sel, total_read)
+                            counter += read_ind.shape[0]
+
+                        total_read += core_ngals
+
+                if counter >= ngals:
+                    break
+
+        # Print some checking statistics
+        logger.info("Read in %d galaxies." % ngals)
+
+        # Apply any Hubble scalings
+        if h is not None:
+            h = float(h)
+            h_conv = read_units(fin)["HubbleConversions"]
+            logger.info("Scaling galaxy properties to h = %.3f" % h)
+            for p in out.dtype.names:
+                try:
+                    conversion = h_conv[p]
+                except KeyError:
+                    logger.warning("Unrecognised galaxy property %s - assuming no " "scaling with Hubble const!" % p)
+                if conversion.lower() != "none":
+                    try:
+                        out[p] = eval(conversion, dict(v=out[p], h=h, log10=np.log10, __builtins__={}))
+                    except:
+                        logger.error("Failed to parse conversion string `%s` for unit" " %s" % (conversion, p))
+
+    return out
+
+
 def read_input_params(fname, h=None, raw=False):
     """ Read in the input parameters from a Meraxes hdf5 output file.
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file.
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
 
     h : float
         Hubble constant (/100) to scale the galaxy properties to.  If
@@ -307,34 +431,31 @@ def read_input_params(fname, h=None, raw=False):
 
     def visitfunc(name, obj):
         if isinstance(obj, h5.Group):
-            props_dict[name] = dict(list(obj.attrs.items()))
+            props_dict[name] = dict(obj.attrs.items())
             arr_to_value(props_dict[name])
 
     logger.info("Reading input params...")
 
     # Open the file for reading
-    fin = h5.File(fname, "r")
-
-    group = fin["InputParams"]
+    with _open_or_reuse(fname) as fin:
+        group = fin["InputParams"]
 
-    props_dict = dict(list(group.attrs.items()))
-    arr_to_value(props_dict)
-    group.visititems(visitfunc)
+        props_dict = dict(group.attrs.items())
+        arr_to_value(props_dict)
+        group.visititems(visitfunc)
 
-    # Update some properties
-    if h is not None:
-        logger.info("Scaling params to h = %.3f" % h)
-        props_dict["BoxSize"] = group.attrs["BoxSize"][0] / h
-        props_dict["PartMass"] = group.attrs["PartMass"][0] / h
+        # Update some properties
+        if h is not None:
+            logger.info("Scaling params to h = %.3f" % h)
+            props_dict["BoxSize"] = group.attrs["BoxSize"][0] / h
+            props_dict["PartMass"] = group.attrs["PartMass"][0] / h
 
-    # Add extra props
-    if not raw:
-        props_dict["Volume"] = props_dict["BoxSize"] ** 3.0 * props_dict["VolumeFactor"]
+        # Add extra props
+        if not raw:
+            props_dict["Volume"] = props_dict["BoxSize"] ** 3.0 * props_dict["VolumeFactor"]
 
-        info = read_git_info(fname)
-        props_dict.update({"model_git_ref": info[0], "model_git_diff": info[1]})
-
-    fin.close()
+            info = read_git_info(fin)
+            props_dict.update({"model_git_ref": info[0], "model_git_diff": info[1]})
 
     return props_dict
 
@@ -345,8 +466,8 @@ def read_units(fname):
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file.
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
 
     Returns
     -------
@@ -362,12 +483,12 @@ def read_units(fname):
 
     def visitunits(name, obj):
         if isinstance(obj, h5.Group):
-            units_dict[name] = dict(list(obj.attrs.items()))
+            units_dict[name] = dict(obj.attrs.items())
             arr_to_value(units_dict[name])
 
     def visitconv(name, obj):
         if isinstance(obj, h5.Group):
-            hubble_conv_dict[name] = dict(list(obj.attrs.items()))
+            hubble_conv_dict[name] = dict(obj.attrs.items())
             arr_to_value(hubble_conv_dict[name])
 
     def sanitize_dict_strings(d):
@@ -382,19 +503,18 @@ def read_units(fname):
     logger.info("Reading units...")
 
     # Open the file for reading
-    fin = h5.File(fname, "r")
-
-    # Read the units
-    for name in ["Units", "HubbleConversions"]:
-        group = fin[name]
-        if name == "Units":
-            units_dict = dict(list(group.attrs.items()))
-            arr_to_value(units_dict)
-            group.visititems(visitunits)
-        if name == "HubbleConversions":
-            hubble_conv_dict = dict(list(group.attrs.items()))
-            arr_to_value(hubble_conv_dict)
-            group.visititems(visitconv)
+    with _open_or_reuse(fname) as fin:
+        # Read the units
+        for name in ["Units", "HubbleConversions"]:
+            group = fin[name]
+            if name == "Units":
+                units_dict = dict(group.attrs.items())
+                arr_to_value(units_dict)
+                group.visititems(visitunits)
+            if name == "HubbleConversions":
+                hubble_conv_dict = dict(group.attrs.items())
+                arr_to_value(hubble_conv_dict)
+                group.visititems(visitconv)
 
     # Sanitize the hubble conversions
     sanitize_dict_strings(hubble_conv_dict)
@@ -402,8 +522,6 @@ def read_units(fname):
     # Put the hubble conversions information inside the units dict for ease
     units_dict["HubbleConversions"] = hubble_conv_dict
 
-    fin.close()
-
     return units_dict
 
 
@@ -412,8 +530,8 @@ def read_git_info(fname):
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file.
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
 
     Returns
     -------
@@ -424,7 +542,7 @@ def read_git_info(fname):
         git diff of the model
     """
 
-    with h5.File(fname, "r") as fin:
+    with _open_or_reuse(fname) as fin:
         gitdiff = fin["gitdiff"][()]
         gitref = fin["gitdiff"].attrs["gitref"].copy()
 
@@ -437,8 +555,8 @@ def read_snaplist(fname, h=None):
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file.
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it).
 
     h : float
         Hubble constant (/100) to scale the galaxy properties to.  If
@@ -464,8 +582,8 @@ def read_snaplist(fname, h=None):
     snaplist = []
     lt_times = []
 
-    with h5.File(fname, "r") as fin:
-        for snap in list(fin.keys()):
+    with _open_or_reuse(fname) as fin:
+        for snap in fin.keys():
             try:
                 zlist.append(fin[snap].attrs["Redshift"][0])
                 snaplist.append(int(snap[-3:]))
@@ -619,8 +737,8 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it)
 
     snapshot : int
         Snapshot from which the progenitors dataset is to be read from.
@@ -638,7 +756,7 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open_or_reuse(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
@@ -683,14 +801,117 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
     return fp_ind
 
 
+def _core_layout(fin, snapshot, cache=None):
+    """Return the group of `snapshot` and the cumulative galaxy counts of its
+    cores.
+
+    If `cache` (a dict) is given, the result is memoised in it so that
+    repeated calls for the same snapshot don't have to resolve the group and
+    every core's Galaxies dataset again.
+    """
+
+    if cache is not None and snapshot in cache:
+        return cache[snapshot]
+
+    snap_group = fin["Snap{:03d}".format(snapshot)]
+    n_cores = fin.attrs["NCores"][0]
+    core_counter = np.cumsum([0] + [snap_group["Core{:d}/Galaxies".format(i)].size for i in range(n_cores)])
+
+    if cache is not None:
+        cache[snapshot] = (snap_group, core_counter)
+
+    return snap_group, core_counter
+
+
+def _read_single_index(fname, snapshot, index, ds_name, target_snapshot, cache=None):
+    """Read the progenitor/descendant index `ds_name` of a single galaxy.
+
+    `target_snapshot` is the snapshot that the stored (per-core) index points
+    in to and is used to convert it to an index into the full snapshot.
+    """
+
+    with _open_or_reuse(fname) as fin:
+        if cache is None:
+            n_cores = fin.attrs["NCores"][0]
+
+            # find the core holding this galaxy and its index within that core,
+            # stopping as soon as we get there so that the remaining cores are
+            # never opened
+            snap_group = fin["Snap{:03d}".format(snapshot)]
+            local_index = index
+            for i_core in range(n_cores):
+                core_size = snap_group["Core{:d}/Galaxies".format(i_core)].size
+                if local_index < core_size:
+                    break
+                local_index -= core_size
+
+            dset = snap_group["Core{:d}/{:s}".format(i_core, ds_name)]
+        else:
+            snap_group, core_counter = _core_layout(fin, snapshot, cache)
+            i_core = np.searchsorted(core_counter, index, side="right") - 1
+            local_index = index - core_counter[i_core]
+
+            key = (snapshot, ds_name, i_core)
+            if key not in cache:
+                cache[key] = snap_group["Core{:d}/{:s}".format(i_core, ds_name)]
+            dset = cache[key]
+
+        val = np.empty(1, "i4")
+        _read_rows(dset, [local_index], val)
+        val = int(val[0])
+
+        # -1 has special meaning and must not be offset!
+        if val > -1:
+            if cache is None:
+                target_group = fin["Snap{:03d}".format(target_snapshot)]
+                val += sum(target_group["Core{:d}/Galaxies".format(i)].size for i in range(i_core))
+            else:
+                val += int(_core_layout(fin, target_snapshot, cache)[1][i_core])
+
+    return val
+
+
+def read_firstprogenitor_index(fname, snapshot, index, cache=None):
+
+    """ Read the FirstProgenitor index of a single galaxy from the Meraxes HDF5
+    file.
+
+    Unlike `read_firstprogenitor_indices`, only the requested value is read.
+
+    Parameters
+    ----------
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it)
+
+    snapshot : int
+        Snapshot from which the progenitor index is to be read from.
+
+    index : int
+        Index of the galaxy in this snapshot.
+
+    cache : dict
+        If given, resolved groups, datasets and core offsets are stored in
+        (and reused from) this dict.  Pass the same (initially empty) dict to
+        repeated calls on the same open file to avoid looking these up every
+        time.  (default: None)
+
+    Returns
+    -------
+    fp_ind : int
+        FirstProgenitor index (-1 if there is no progenitor)
+    """
+
+    return _read_single_index(fname, snapshot, index, "FirstProgenitorIndices", snapshot - 1, cache)
+
+
 def read_nextprogenitor_indices(fname, snapshot, pandas=False):
 
     """ Read the NextProgenitor indices from the Meraxes HDF5 file.
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it)
 
     snapshot : int
         Snapshot from which the progenitors dataset is to be read from.
@@ -707,7 +928,7 @@ def read_nextprogenitor_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open_or_reuse(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
@@ -747,8 +968,8 @@ def read_descendant_indices(fname, snapshot, pandas=False):
 
     Parameters
     ----------
-    fname : str
-        Full path to input hdf5 master file
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it)
 
     snapshot : int
         Snapshot from which the descendant dataset is to be read from.
@@ -765,7 +986,7 @@ def read_descendant_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open_or_reuse(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
@@ -810,6 +1031,38 @@ def read_descendant_indices(fname, snapshot, pandas=False):
     return desc_ind
 
 
+def read_descendant_index(fname, snapshot, index, cache=None):
+
+    """ Read the Descendant index of a single galaxy from the Meraxes HDF5 file.
+
+    Unlike `read_descendant_indices`, only the requested value is read.
+
+    Parameters
+    ----------
+    fname : str or h5py.File
+        Full path to input hdf5 master file (or an already open handle to it)
+
+    snapshot : int
+        Snapshot from which the descendant index is to be read from.
+
+    index : int
+        Index of the galaxy in this snapshot.
+
+    cache : dict
+        If given, resolved groups, datasets and core offsets are stored in
+        (and reused from) this dict.  Pass the same (initially empty) dict to
+        repeated calls on the same open file to avoid looking these up every
+        time.  (default: None)
+
+    Returns
+    -------
+    desc_ind : int
+        Descendant index (-1 if there is no descendant)
+    """
+
+    return _read_single_index(fname, snapshot, index, "DescendantIndices", snapshot + 1, cache)
+
+
 def read_grid(spec, fname, snapshot, name, h=None, h_scaling={}):
 
     """ Read a grid from the Meraxes HDF5 file.
@@ -877,7 +1130,7 @@ def read_grid(spec, fname, snapshot, name, h=None, h_scaling={}):
         try:
             conversion = h_conv[name]
         except KeyError:
-            logger.warn("Unknown scaling for grid %s - assuming no " "scaling with Hubble const!" % name)
+            logger.warning("Unknown scaling for grid %s - assuming no " "scaling with Hubble const!" % name)
             conversion = "None"
 
         if conversion.lower() != "none":
@@ -990,32 +1243,30 @@ def read_global_xH(fname, snapshot, weight="volume"):
         ]
 
     if weight == "volume":
-        prop = "volume_weighted_global_xH"
+        # old style Meraxes file outputs only have the (volume weighted) global_xH attribute
+        props = ("volume_weighted_global_xH", "global_xH")
     elif weight == "mass":
-        prop = "mass_weighted_global_xH"
+        props = ("mass_weighted_global_xH",)
     else:
         raise ValueError("Unrecognized weighting scheme: %s" % weight)
 
     snapshot = np.array(snapshot)
-    global_xH = np.zeros(snapshot.size)
+    global_xH = np.full(snapshot.size, np.nan)
 
     with h5.File(fname, "r") as fin:
         for ii, snap in enumerate(snapshot):
-            ds_name = "Snap{:03d}/Grids/xH".format(snap)
             try:
-                global_xH[ii] = fin[ds_name].attrs[prop][0]
+                attrs = fin["Snap{:03d}/Grids/xH".format(snap)].attrs
             except KeyError:
-                if weight == "volume":
-                    # This case deals with old style Meraxes file outputs
-                    try:
-                        global_xH[ii] = fin[ds_name].attrs["global_xH"][0]
-                    except KeyError:
-                        pass
-                    else:
-                        continue
+                attrs = {}
 
-                global_xH[ii] = np.nan
-                logger.warning("No global_xH found for snapshot %d in file %s" % (snap, fname))
+            for prop in props:
+                value = attrs.get(prop)
+                if value is not None:
+                    global_xH[ii] = value[0]
+                    break
+            else:
+                logger.warning("No global_xH found for snapshot %d in file %s", snap, fname)
 
     if snapshot.size == 1:
         return global_xH[0]
@@ -1075,21 +1326,22 @@ def read_global_J_21(fname, snapshot):
                     global_J_21[ii] = np.nan
                     logger.warning("No global_J_21 found for snapshot %d in file %s" % (snap, fname))
     else:
-        # The global value hasn't been precalculated. We'll need to calculate it ourselves from the grid. Since the grid
-        # may be large we will need to sort the values before summing to try and beat down as much floating point error
-        # as possible. This will be slow for large grids!
+        # The global value hasn't been precalculated. We'll need to calculate it ourselves from the grid. The (single
+        # precision) values are accumulated in double precision with numpy's pairwise summation, which keeps the
+        # floating point error well below that of the stored values without needing to sort them first.
         logger.warning(
             "No volume_weighted_global_J_21 values found in Meraxes file. Calculating manually (this may "
             "be slower than expected)..."
         )
         with h5.File(fname, "r") as fin:
             for ii, snap in enumerate(snapshot):
-                ds_name = "Snap{:03d}/Grids/J_21".format(snap)
                 try:
-                    global_J_21[ii] = np.sort(fin[ds_name][:].astype(np.float64)).sum() / float(fin[ds_name].size)
+                    grid = fin["Snap{:03d}/Grids/J_21".format(snap)][:]
                 except KeyError:
                     global_J_21[ii] = np.nan
                     logger.warning("No J_21 grid found for snapshot %d in file %s" % (snap, fname))
+                else:
+                    global_J_21[ii] = grid.mean(dtype=np.float64)
 
     if snapshot.size == 1:
         return global_J_21[0]
@@ -1,20 +1,21 @@
+from __future__ import annotations
+
 import logging
+import os
+import pickle
+from functools import lru_cache
+from importlib import metadata
 from pathlib import Path
-from textwrap import dedent
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
 import click
 import cycler
-import matplotlib.pyplot as plt
+import h5py as h5
 import numpy as np
-import pandas as pd
-import seaborn as sns
-from astrodatapy.number_density import number_density
 
-from .. import munge
+from .. import munge, setup_logging
 from . import (
     bh_bolometric_mags,
-    check_for_redshift,
     read_gals,
     read_global_xH,
     read_input_params,
@@ -22,10 +23,227 @@ from . import (
     read_snaplist,
     set_little_h,
 )
+from .io import _galaxy_dtype
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
 
 logger = logging.getLogger(__name__)
 
 
+_MARKER_CYCLE = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
+
+# the galaxy properties needed by plot_bolometric_qlf
+_QLF_REQUIRED = frozenset(("BlackHoleMass", "BlackHoleAccretedHotMass", "BlackHoleAccretedColdMass", "dt"))
+
+# ALFALFA HI mass function of Martin et al. (2010) (h=0.7). Values provided by H. Kim.
+_HIMF_MARTIN2010 = np.array(
+    [
+        [6.3, -0.743, 0.366],
+        [6.5, -0.839, 0.259],
+        [6.7, -0.875, 0.191],
+        [6.9, -0.935, 0.153],
+        [7.1, -1.065, 0.154],
+        [7.3, -1.130, 0.114],
+        [7.5, -1.163, 0.082],
+        [7.7, -1.224, 0.070],
+        [7.9, -1.363, 0.061],
+        [8.1, -1.460, 0.054],
+        [8.3, -1.493, 0.046],
+        [8.5, -1.573, 0.043],
+        [8.7, -1.664, 0.038],
+        [8.9, -1.689, 0.029],
+        [9.1, -1.673, 0.023],
+        [9.3, -1.740, 0.021],
+        [9.5, -1.893, 0.021],
+        [9.7, -2.061, 0.018],
+        [9.9, -2.288, 0.017],
+        [10.1, -2.596, 0.017],
+        [10.3, -3.006, 0.024],
+        [10.5, -3.641, 0.057],
+        [10.7, -4.428, 0.131],
+        [10.9, -5.320, 0.376],
+    ]
+)
+_HIMF_MARTIN2010.setflags(write=False)
+
+# HIPASS HI mass function of Zwaan et al. (2005) (h=0.75). Values provided by H. Kim.
+_HIMF_ZWAAN2005 = np.array(
+    [
+        [7.186, -0.733, 0.397, 0.2039],
+        [7.3345, -0.8838, 0.3179, 0.1816],
+        [7.483, -1.1, 0.301, 0.1761],
+        [7.6315, -1.056, 0.1955, 0.1343],
+        [7.78, -1.207, 0.1992, 0.136],
+        [7.9285, -1.35, 0.1374, 0.1042],
+        [8.077, -1.315, 0.08988, 0.07443],
+        [8.2255, -1.331, 0.07159, 0.06144],
+        [8.374, -1.308, 0.05789, 0.05108],
+        [8.5225, -1.31, 0.04438, 0.04027],
+        [8.671, -1.455, 0.04284, 0.03899],
+        [8.8195, -1.555, 0.03725, 0.03431],
+        [8.968, -1.55, 0.03187, 0.02969],
+        [9.1165, -1.69, 0.03179, 0.02962],
+        [9.265, -1.735, 0.02666, 0.02512],
+        [9.4135, -1.843, 0.02456, 0.02324],
+        [9.562, -1.974, 0.02352, 0.02231],
+        [9.7105, -2.166, 0.02506, 0.0237],
+        [9.859, -2.401, 0.02768, 0.02602],
+        [10.0075, -2.785, 0.03275, 0.03045],
+        [10.156, -3.013, 0.03628, 0.03348],
+        [10.3045, -3.417, 0.05028, 0.04506],
+        [10.453, -4.044, 0.07708, 0.06544],
+        [10.6015, -4.83, 0.1562, 0.1147],
+        [10.75, -5.451, 0.2567, 0.1602],
+    ]
+)
+_HIMF_ZWAAN2005.setflags(write=False)
+
+
+# Fixed figure margins which leave room for the axis labels.
+_MARGINS = dict(left=0.14, right=0.97, bottom=0.13, top=0.97)
+
+
+def _subplots(ax=None, **margins):
+    """Create a new figure with a single axis.
+
+    The figure uses fixed margins (`_MARGINS`, updated with `margins`) rather than `tight_layout`, which costs an extra
+    renderer pass every time the figure is drawn. If `ax` is given then it is cleared and returned along with its
+    figure instead, which is much cheaper than setting up a new figure.
+    """
+    if ax is not None:
+        ax.cla()
+        return ax.figure, ax
+
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(1, 1)
+    fig.subplots_adjust(**{**_MARGINS, **margins})
+    return fig, ax
+
+
+def _safe_log10_positive(x: np.ndarray, shift: float = 0.0):
+    """Return log10(x) + shift for just the positive values of `x`.
+
+    Only the values with a finite log are passed to `np.log10` (so no warnings are raised). The log and shift are then
+    both applied in place to the copy made by selecting those values, so there are no further temporary arrays.
+    """
+    out = x[x > 0]
+    np.log10(out, out=out)
+    if shift:
+        out += shift
+    return out
+
+
+def _observations_cache_path(feature: str, z_target: float, h: float):
+    """Return the path of the on-disk cache of the parsed observations for `feature` at `z_target`."""
+    try:
+        version = metadata.version("astrodatapy")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+
+    cache_dir = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "dragons" / "number_density"
+    return cache_dir / f"{feature}_z{z_target:.4f}_h{h:.6f}_astrodatapy-{version}.pickle"
+
+
+@lru_cache(maxsize=None)
+def _read_observations(feature: str, z_target: float, h: float):
+    """Read the (label, datatype, x, y, err) of each observational dataset for `feature` at `z_target`.
+
+    The observations are only read and parsed once for each set of arguments. Everything needed to plot them is worked
+    out here, once, rather than by every plot: the values (and limits) are converted to log10 and `err` holds the
+    ready-made error bars for "data", the upper limit arrow lengths for "dataULimit", or the lower and upper bounds of
+    the shaded region for anything else. The returned arrays are read-only as they are shared.
+
+    As parsing the observations is slow, the results are also cached on disk (in `$XDG_CACHE_HOME/dragons`) for later
+    runs and worker processes.
+    """
+    cache_path = _observations_cache_path(feature, z_target, h)
+    try:
+        with open(cache_path, "rb") as fp:
+            observations = pickle.load(fp)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        observations = _parse_observations(feature, z_target, h)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first so that a concurrent reader never sees a partial cache
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as fp:
+                pickle.dump(observations, fp)
+            tmp_path.replace(cache_path)
+        except OSError as error:
+            logger.debug(f"Unable to cache the {feature} observations: {error}")
+
+    for _, _, x, y, err in observations:
+        for arr in (x, y, err):
+            arr.setflags(write=False)
+
+    return observations
+
+
+def _parse_observations(feature: str, z_target: float, h: float):
+    """Read and parse the observations for `_read_observations`."""
+    from astrodatapy.number_density import number_density
+
+    obs = number_density(feature=feature, z_target=z_target, h=h, quiet=True)
+
+    observations = []
+    for ii in range(obs.n_target_observation):
+        data = obs.target_observation["Data"][ii]
+        datatype = obs.target_observation["DataType"][ii]
+
+        x = data[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y = np.log10(data[:, 1])
+            if datatype == "dataULimit":
+                err = -0.2 * y
+            else:
+                upper, lower = np.log10(data[:, 2]), np.log10(data[:, 3])
+                err = np.vstack([y - lower, upper - y]) if datatype == "data" else np.vstack([upper, lower])
+
+        observations.append((obs.target_observation.index[ii], datatype, x, y, err))
+
+    return tuple(observations)
+
+
+def _plot_observations(ax, feature: str, z_target: float, h: float, xoffset: float = 0.0, alpha: float = 0.6):
+    """Plot the observational datasets for `feature` at `z_target` on `ax`, shifting them by `xoffset` in x."""
+    for (label, datatype, x, y, err), prop in zip(_read_observations(feature, z_target, h), _MARKER_CYCLE):
+        if xoffset:
+            x = x + xoffset
+        if datatype == "data":
+            ax.errorbar(x, y, yerr=err, label=label, ls="", mec="w", alpha=alpha, **prop)
+        elif datatype == "dataULimit":
+            ax.errorbar(x, y, yerr=err, uplims=True, label=label, mec="w", alpha=alpha, **prop)
+        else:
+            ax.plot(x, y, label=label, lw=3, alpha=alpha)
+            ax.fill_between(x, err[0], err[1], alpha=0.4)
+
+
+@lru_cache(maxsize=None)
+def _himf_observations(h: float):
+    """Return the (label, x, y, yerr) of the HI mass function observations, rescaled to a Hubble constant of `h`.
+
+    The rescaling is only done once for each `h` and the returned arrays are read-only as they are shared.
+    """
+    observations = []
+    for label, data, obs_hubble in (
+        ("Martin et al. (2010)", _HIMF_MARTIN2010, 0.7),
+        ("Zwaan et al. (2005)", _HIMF_ZWAAN2005, 0.75),
+    ):
+        log_h = np.log10(h / obs_hubble)
+        x = data[:, 0] - 2 * log_h
+        y = data[:, 1] + 3 * log_h
+        # Martin et al. have symmetric errors, Zwaan et al. have lower and upper ones
+        yerr = data[:, 2] if data.shape[1] == 3 else data[:, 2:].T
+        for arr in (x, y):
+            arr.setflags(write=False)
+        observations.append((label, x, y, yerr))
+
+    return tuple(observations)
+
+
 class MeraxesOutput:
     """A class for dealing with Meraxes output.
 
@@ -37,19 +255,57 @@ class MeraxesOutput:
         The directory where plots should be stored. (default: `./plots`)
     save : bool
         Set to `True` to save output. (default: False)
+    pdf : PdfPages, optional
+        A multi-page PDF to add the saved plots to, rather than saving each to its own file in `plot_dir`. (default:
+        None)
     """
 
     def __init__(
-        self, fname: Union[str, Path], plot_dir: Union[str, Path] = "./plots", save: bool = False,
+        self,
+        fname: Union[str, Path],
+        plot_dir: Union[str, Path] = "./plots",
+        save: bool = False,
+        pdf: Union[PdfPages, None] = None,
     ):
         self.fname = Path(fname)
         self.plot_dir = Path(plot_dir)
         self.save = save
-        set_little_h(fname)
-        self.snaplist, self.zlist, self.lbtimes = read_snaplist(fname)
-        self.params = read_input_params(fname)
+        self.pdf = pdf
+        if save:
+            self.plot_dir.mkdir(parents=True, exist_ok=True)
+
+        # read all of the metadata we need in one visit to the file
+        with h5.File(self.fname, "r") as fin:
+            set_little_h(fin)
+            self.snaplist, self.zlist, self.lbtimes = read_snaplist(fin)
+            self.params = read_input_params(fin)
 
-    def plot_smf(self, redshift: float, imfscaling: float = 1.0, gals: np.ndarray | None = None):
+    def _check_for_redshift(self, redshift: float, tol: float = 0.1):
+        """Find the closest snapshot to `redshift`, as `check_for_redshift` does but without re-reading the file."""
+        w = np.argmin(np.abs(self.zlist - redshift))
+
+        if np.abs(self.zlist[w] - redshift) > tol:
+            raise KeyError("No redshifts within tolerance found.")
+
+        return int(self.snaplist[w]), self.zlist[w]
+
+    def _savefig(self, fig: plt.Figure, ax: plt.Axes, fname: str):
+        """Save a plot, either as a new page of `self.pdf` or to `fname` in the plot directory."""
+        import seaborn as sns
+
+        sns.despine(ax=ax)
+        if self.pdf is not None:
+            self.pdf.savefig(fig)
+        else:
+            fig.savefig(self.plot_dir / fname)
+
+    def plot_smf(
+        self,
+        redshift: float,
+        imfscaling: float = 1.0,
+        gals: Union[np.ndarray, dict, None] = None,
+        ax: Union[plt.Axes, None] = None,
+    ):
         """Plot the stellar mass function for a given redshift.
 
         Parameters
@@ -58,9 +314,11 @@ class MeraxesOutput:
             The requested redshift to plot.
         imfscaling : float
             Scaling for IMF from Salpeter (Mstar[IMF] = Mstar[Salpeter] * imfscaling) (default: 1.0)
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -71,54 +329,20 @@ class MeraxesOutput:
         """
 
         imfscaling = np.log10(imfscaling)
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
 
         logger.info(f"Plotting z={redshift:.2f} SMF")
 
         if gals is None:
-            stellar = np.log10(read_gals(self.fname, snap, props=["StellarMass"])["StellarMass"]) + 10.0
+            stellar = read_gals(self.fname, snap, props=["StellarMass"])["StellarMass"]
         else:
-            stellar = np.log10(gals["StellarMass"]) + 10.0
+            stellar = gals["StellarMass"]
 
-        stellar = stellar[np.isfinite(stellar)]
+        stellar = _safe_log10_positive(stellar, 10.0)
         smf = munge.mass_function(stellar, self.params["Volume"], 30)
 
-        obs = number_density(feature="GSMF", z_target=z, h=self.params["Hubble_h"], quiet=True)
-
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        alpha = 0.6
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
-        for ii, prop in zip(range(obs.n_target_observation), props):
-            data = obs.target_observation["Data"][ii]
-            data[:, 0] += imfscaling
-            label = obs.target_observation.index[ii]
-            datatype = obs.target_observation["DataType"][ii]
-            data[:, 1:] = np.log10(data[:, 1:])
-            if datatype == "data":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=[data[:, 1] - data[:, 3], data[:, 2] - data[:, 1]],
-                    label=label,
-                    ls="",
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            elif datatype == "dataULimit":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=-0.2 * data[:, 1],
-                    uplims=True,
-                    label=label,
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            else:
-                ax.plot(data[:, 0], data[:, 1], label=label, lw=3, alpha=alpha)
-                ax.fill_between(data[:, 0], data[:, 2], data[:, 3], alpha=0.4)
+        fig, ax = _subplots(ax)
+        _plot_observations(ax, "GSMF", z, self.params["Hubble_h"], xoffset=imfscaling)
 
         ax.plot(smf[:, 0], np.log10(smf[:, 1]), ls="-", color="k", lw=4, label="Meraxes run")
 
@@ -133,16 +357,18 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"smf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"smf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
-    def plot_xHI(self):
+    def plot_xHI(self, ax: Union[plt.Axes, None] = None):
         """Plot the neutral fraction evolution.
 
+        Parameters
+        ----------
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
+
         Returns
         -------
         fig : matplotlib.Figure
@@ -154,34 +380,31 @@ class MeraxesOutput:
         logger.info("Plotting xHI evolution")
 
         snap_z5 = self.snaplist[np.argmin(np.abs(5.0 - self.zlist))]
+        redshift = self.zlist[: snap_z5 + 1]
         try:
-            xHI = pd.DataFrame(dict(snap=np.arange(snap_z5 + 1), redshift=self.zlist[: snap_z5 + 1]))
-            xHI["xHI"] = read_global_xH(self.fname, xHI.snap)
+            xHI = np.atleast_1d(read_global_xH(self.fname, np.arange(snap_z5 + 1)))
         except ValueError:
             logger.warning("No xHI values in Meraxes output file")
             return []
 
-        if xHI.dropna().shape[0] == 0:
+        if np.isnan(xHI).all():
             logger.warning("No finite xHI values in Meraxes output file")
             return []
 
-        start = xHI.query("xHI == xHI.max()").index[0]
-        end = xHI.query("xHI == xHI.min()").index[0]
-        xHI.loc[:start, "xHI"] = 1.0
-        xHI.loc[end + 1 :] = 0.0
+        # the neutral fraction is fully neutral before its maximum and fully
+        # ionised after its minimum
+        start = np.nanargmax(xHI)
+        end = np.nanargmin(xHI)
+        xHI[: start + 1] = 1.0
+        xHI[end + 1 :] = 0.0
 
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        xHI.plot(
-            "redshift", "xHI", ls="-", label="Meraxes run", lw=4, color="k", ax=ax, legend=None,
-        )
+        fig, ax = _subplots(ax)
+        ax.plot(redshift, xHI, ls="-", label="Meraxes run", lw=4, color="k")
 
         ax.set(ylim=(0, 1), xlim=(15, 5), ylabel=r"$x_{\rm HI}$", xlabel="redshift")
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / "xHI.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, "xHI.pdf")
 
         return fig, ax
 
@@ -195,11 +418,11 @@ class MeraxesOutput:
         ax : matplotlib.Axes
             The matplotlib axis
         """
+        import matplotlib.pyplot as plt
+        import seaborn as sns
 
         logger.info("Plotting 21cm power spectrum.")
 
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-
         ind_z5 = np.argmin(np.abs(5.0 - self.zlist))
 
         _flag_found = False
@@ -217,6 +440,9 @@ class MeraxesOutput:
             logger.warning("No PS values in Meraxes output file")
             return []
 
+        # leave room for the colorbar label
+        fig, ax = _subplots(right=0.88)
+
         mod_snaps = int(np.ceil(n_snaps / 20))
         palette = "flare"
         n_colors = int(np.ceil(n_snaps / mod_snaps))
@@ -236,20 +462,23 @@ class MeraxesOutput:
             cmap=sns.color_palette(palette, as_cmap=True),
         )
         s_map.set_array(redshifts)
-        cbar = plt.colorbar(s_map, ticks=redshifts[::2], format="%.2f")
+        cbar = fig.colorbar(s_map, ax=ax, ticks=redshifts[::2], format="%.2f")
         cbar.set_label("redshift")
 
         ax.set(ylabel=r"$\Delta^2(k)$", xlabel=r"$\log_{10}\left( k / {\rm Mpc^{-1}}\right)$")
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / "21cm_ps.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, "21cm_ps.pdf")
 
         return fig, ax
 
-    def plot_sfrf(self, redshift: float, imfscaling: float = 1.0, gals: np.ndarray = None):
+    def plot_sfrf(
+        self,
+        redshift: float,
+        imfscaling: float = 1.0,
+        gals: Union[np.ndarray, dict, None] = None,
+        ax: Union[plt.Axes, None] = None,
+    ):
         """Plot the star formation rate function.
 
         Parameters
@@ -258,9 +487,11 @@ class MeraxesOutput:
             The redshift of interest
         imfscaling : float
             Scaling for IMF from Salpeter (Mstar[IMF] = Mstar[Salpeter] * imfscaling) (default: 1.0)
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -271,7 +502,7 @@ class MeraxesOutput:
         """
 
         imfscaling = np.log10(imfscaling)
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
 
         logger.info(f"Plotting z={redshift:.2f} SFRF")
 
@@ -280,45 +511,11 @@ class MeraxesOutput:
         else:
             sfr = gals["Sfr"][:]
 
-        sfr = np.log10(sfr[sfr > 0])
+        sfr = _safe_log10_positive(sfr)
         sfrf = munge.mass_function(sfr, self.params["Volume"], 30)
 
-        obs = number_density(feature="SFRF", z_target=redshift, h=self.params["Hubble_h"], quiet=True)
-
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        alpha = 0.6
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
-        for ii, prop in zip(range(obs.n_target_observation), props):
-            data = obs.target_observation["Data"][ii]
-            data[:, 0] += imfscaling
-            label = obs.target_observation.index[ii]
-            datatype = obs.target_observation["DataType"][ii]
-            data[:, 1:] = np.log10(data[:, 1:])
-            if datatype == "data":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=[data[:, 1] - data[:, 3], data[:, 2] - data[:, 1]],
-                    label=label,
-                    ls="",
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            elif datatype == "dataULimit":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=-0.2 * data[:, 1],
-                    uplims=True,
-                    label=label,
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            else:
-                ax.plot(data[:, 0], data[:, 1], label=label, lw=3, alpha=alpha)
-                ax.fill_between(data[:, 0], data[:, 2], data[:, 3], alpha=0.4)
+        fig, ax = _subplots(ax)
+        _plot_observations(ax, "SFRF", redshift, self.params["Hubble_h"], xoffset=imfscaling)
 
         ax.plot(
             sfrf[:, 0], np.log10(sfrf[:, 1]), ls="-", color="k", lw=4, label="Meraxes run",
@@ -335,15 +532,16 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"sfrf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"sfrf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
     def plot_uvlf(
-        self, redshift: float, mag_index: Union[int, None] = None, gals: np.ndarray = None,
+        self,
+        redshift: float,
+        mag_index: Union[int, None] = None,
+        gals: Union[np.ndarray, dict, None] = None,
+        ax: Union[plt.Axes, None] = None,
     ):
         """Plot the UV luminosity function.
 
@@ -351,9 +549,11 @@ class MeraxesOutput:
         ----------
         redshift: float
             The redshift of interest
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -363,7 +563,7 @@ class MeraxesOutput:
             The matplotlib axis
         """
 
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
 
         logger.info(f"Plotting z={redshift:.2f} UVLF")
 
@@ -383,41 +583,8 @@ class MeraxesOutput:
         mags = mags[mags < -10.0]
         lf = munge.mass_function(mags, self.params["Volume"], 30)
 
-        obs = number_density(feature="GLF_UV", z_target=redshift, h=self.params["Hubble_h"], quiet=True)
-
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        alpha = 0.6
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
-        for ii, prop in zip(range(obs.n_target_observation), props):
-            data = obs.target_observation["Data"][ii]
-            label = obs.target_observation.index[ii]
-            datatype = obs.target_observation["DataType"][ii]
-            data[:, 1:] = np.log10(data[:, 1:])
-            if datatype == "data":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=[data[:, 1] - data[:, 3], data[:, 2] - data[:, 1]],
-                    label=label,
-                    ls="",
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            elif datatype == "dataULimit":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=-0.2 * data[:, 1],
-                    uplims=True,
-                    label=label,
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            else:
-                ax.plot(data[:, 0], data[:, 1], label=label, lw=3, alpha=alpha)
-                ax.fill_between(data[:, 0], data[:, 2], data[:, 3], alpha=0.4)
+        fig, ax = _subplots(ax)
+        _plot_observations(ax, "GLF_UV", redshift, self.params["Hubble_h"])
 
         ax.plot(lf[:, 0], np.log10(lf[:, 1]), ls="-", color="k", lw=4, label="Meraxes run")
 
@@ -429,23 +596,22 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"uvlf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"uvlf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
-    def plot_HImf(self, redshift: float, gals: np.ndarray = None):
+    def plot_HImf(self, redshift: float, gals: Union[np.ndarray, dict, None] = None, ax: Union[plt.Axes, None] = None):
         """Plot the HI mass function.
 
         Parameters
         ----------
         redshift: float
             The redshift of interest
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -455,7 +621,7 @@ class MeraxesOutput:
             The matplotlib axis
         """
 
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
         logger.info(f"Plotting z={redshift:.2f} HImf")
 
         plot_obs = False
@@ -464,109 +630,17 @@ class MeraxesOutput:
         else:
             plot_obs = True
 
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))()
-        alpha = 0.6
+        fig, ax = _subplots(ax)
 
         if plot_obs:
-            # ALFALFA-Martin et al. 2010 (h=0.7)
-            # Values provided by H. Kim.
-            obs_hubble = 0.7
-            _raw = dedent(
-                """\
-             6.3  -0.743   0.366
-             6.5  -0.839   0.259
-             6.7  -0.875   0.191
-             6.9  -0.935   0.153
-             7.1  -1.065   0.154
-             7.3  -1.130   0.114
-             7.5  -1.163   0.082
-             7.7  -1.224   0.070
-             7.9  -1.363   0.061
-             8.1  -1.460   0.054
-             8.3  -1.493   0.046
-             8.5  -1.573   0.043
-             8.7  -1.664   0.038
-             8.9  -1.689   0.029
-             9.1  -1.673   0.023
-             9.3  -1.740   0.021
-             9.5  -1.893   0.021
-             9.7  -2.061   0.018
-             9.9  -2.288   0.017
-            10.1  -2.596   0.017
-            10.3  -3.006   0.024
-            10.5  -3.641   0.057
-            10.7  -4.428   0.131
-            10.9  -5.320   0.376
-            """
-            )
-            data = np.fromstring(_raw, sep=" ").reshape(-1, 3)
-            data[:, 0] -= 2 * np.log10(self.params["Hubble_h"] / obs_hubble)
-            data[:, 1] += 3 * np.log10(self.params["Hubble_h"] / obs_hubble)
-
-            ax.errorbar(
-                data[:, 0],
-                data[:, 1],
-                yerr=data[:, 2],
-                label="Martin et al. (2010)",
-                ls="",
-                mec="w",
-                alpha=alpha,
-                **next(props),
-            )
-
-            # HIPASS-Zwaan et al. 2005 (h=0.75)
-            # Values provided by H. Kim.
-            obs_hubble = 0.75
-            _raw = dedent(
-                """\
-            7.186 -0.733 0.397 0.2039
-            7.3345 -0.8838 0.3179 0.1816
-            7.483 -1.1 0.301 0.1761
-            7.6315 -1.056 0.1955 0.1343
-            7.78 -1.207 0.1992 0.136
-            7.9285 -1.35 0.1374 0.1042
-            8.077 -1.315 0.08988 0.07443
-            8.2255 -1.331 0.07159 0.06144
-            8.374 -1.308 0.05789 0.05108
-            8.5225 -1.31 0.04438 0.04027
-            8.671 -1.455 0.04284 0.03899
-            8.8195 -1.555 0.03725 0.03431
-            8.968 -1.55 0.03187 0.02969
-            9.1165 -1.69 0.03179 0.02962
-            9.265 -1.735 0.02666 0.02512
-            9.4135 -1.843 0.02456 0.02324
-            9.562 -1.974 0.02352 0.02231
-            9.7105 -2.166 0.02506 0.0237
-            9.859 -2.401 0.02768 0.02602
-            10.0075 -2.785 0.03275 0.03045
-            10.156 -3.013 0.03628 0.03348
-            10.3045 -3.417 0.05028 0.04506
-            10.453 -4.044 0.07708 0.06544
-            10.6015 -4.83 0.1562 0.1147
-            10.75 -5.451 0.2567 0.1602
-            """
-            )
-            data = np.fromstring(_raw, sep=" ").reshape(-1, 4)
-            data[:, 0] -= 2 * np.log10(self.params["Hubble_h"] / obs_hubble)
-            data[:, 1] += 3 * np.log10(self.params["Hubble_h"] / obs_hubble)
-
-            ax.errorbar(
-                data[:, 0],
-                data[:, 1],
-                yerr=[data[:, 2], data[:, 3]],
-                label="Zwaan et al. (2005)",
-                ls="",
-                mec="w",
-                alpha=alpha,
-                **next(props),
-            )
+            for (label, x, y, yerr), prop in zip(_himf_observations(self.params["Hubble_h"]), _MARKER_CYCLE):
+                ax.errorbar(x, y, yerr=yerr, label=label, ls="", mec="w", alpha=0.6, **prop)
 
         if gals is None:
-            HImass = np.log10(read_gals(self.fname, snap, props=["HIMass"])["HIMass"]) + 10.0
+            HImass = read_gals(self.fname, snap, props=["HIMass"])["HIMass"]
         else:
-            HImass = np.log10(gals["HIMass"]) + 10.0
-        HImass = HImass[np.isfinite(HImass)]
+            HImass = gals["HIMass"]
+        HImass = _safe_log10_positive(HImass, 10.0)
         mf = munge.mass_function(HImass, self.params["Volume"], 30)
 
         ax.plot(
@@ -584,23 +658,24 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"HImf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"HImf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
-    def plot_bolometric_qlf(self, redshift: float, gals: np.ndarray = None):
+    def plot_bolometric_qlf(
+        self, redshift: float, gals: Union[np.ndarray, dict, None] = None, ax: Union[plt.Axes, None] = None,
+    ):
         """Plot the bolometric quasar luminosity function.
 
         Parameters
         ----------
         redshift: float
             The redshift of interest
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -609,69 +684,34 @@ class MeraxesOutput:
         ax : matplotlib.Axes
             The matplotlib axis
         """
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
 
         logger.info(f"Plotting z={redshift:.2f} bolometric QLF.")
         logger.warning("This plotting routine is under construction and should not be trusted!")
 
-        required_props = [
-            "BlackHoleMass",
-            "BlackHoleAccretedHotMass",
-            "BlackHoleAccretedColdMass",
-            "dt",
-        ]
+        required_props = sorted(_QLF_REQUIRED)
         if gals is None:
             try:
                 gals = read_gals(self.fname, snap, props=required_props)
             except ValueError:
                 logger.warning(f"Unable to read required properties: {required_props}")
                 return []
-        else:
-            if not all([prop in gals.dtype.names for prop in required_props]):
-                logger.warning(f"Unable to read required properties: {required_props}")
-                return []
+        elif not _QLF_REQUIRED.issubset(gals.keys() if isinstance(gals, dict) else gals.dtype.names):
+            logger.warning(f"Unable to read required properties: {required_props}")
+            return []
 
-        mags = bh_bolometric_mags(gals, self.params)
-        lum = (4.74 - mags[np.isfinite(mags)]) / 2.5
+        # the plot isn't seeded, so draw the random glow times and viewing angles with a fresh (faster) Generator
+        mags = bh_bolometric_mags(gals, self.params, rng=np.random.default_rng())
+        # convert back to log10(L/Lsun) in place, dropping the black holes that aren't shining
+        lum = mags[np.isfinite(mags)]
+        lum -= 4.74
+        lum /= -2.5
         lf = munge.mass_function(lum, self.params["Volume"], 30)
 
         #  lf[:, 0] *= 1.0 - np.cos(np.deg2rad(self.params['quasar_open_angle']) / 2.0)  # normalized to 2pi
 
-        obs = number_density(feature="QLF_bolometric", z_target=redshift, h=self.params["Hubble_h"], quiet=True,)
-
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        alpha = 0.6
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
-        for ii, prop in zip(range(obs.n_target_observation), props):
-            data = obs.target_observation["Data"][ii]
-            label = obs.target_observation.index[ii]
-            datatype = obs.target_observation["DataType"][ii]
-            data[:, 1:] = np.log10(data[:, 1:])
-            if datatype == "data":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=[data[:, 1] - data[:, 3], data[:, 2] - data[:, 1]],
-                    label=label,
-                    ls="",
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            elif datatype == "dataULimit":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=-0.2 * data[:, 1],
-                    uplims=True,
-                    label=label,
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            else:
-                ax.plot(data[:, 0], data[:, 1], label=label, lw=3, alpha=alpha)
-                ax.fill_between(data[:, 0], data[:, 2], data[:, 3], alpha=0.4)
+        fig, ax = _subplots(ax)
+        _plot_observations(ax, "QLF_bolometric", redshift, self.params["Hubble_h"])
 
         ax.plot(lf[:, 0], np.log10(lf[:, 1]), ls="-", color="k", lw=4, label="Meraxes run")
 
@@ -686,23 +726,22 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"bolometric_qlf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"bolometric_qlf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
-    def plot_bhmf(self, redshift: float, gals: np.ndarray = None):
+    def plot_bhmf(self, redshift: float, gals: Union[np.ndarray, dict, None] = None, ax: Union[plt.Axes, None] = None):
         """Plot the black hole mass function for a given redshift.
 
         Parameters
         ----------
         redshift : float
             The requested redshift to plot.
-        gals : np.ndarray, optional
-            The galaxies (already read in with correct Hubble corrections applied). If not supplied, the necessary
-            galaxy properties will be read in.
+        gals : np.ndarray or dict, optional
+            The galaxies (already read in with correct Hubble corrections applied), either as a structured array or a
+            dict of arrays for each property. If not supplied, the necessary galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -712,7 +751,7 @@ class MeraxesOutput:
             The matplotlib axis
         """
 
-        snap, z = check_for_redshift(self.fname, redshift)
+        snap, z = self._check_for_redshift(redshift)
 
         logger.info(f"Plotting z={redshift:.2f} BHMF")
 
@@ -721,44 +760,11 @@ class MeraxesOutput:
         else:
             bhm = gals["BlackHoleMass"]
 
-        bhm = np.log10(bhm[bhm > 0]) + 10.0
+        bhm = _safe_log10_positive(bhm, 10.0)
         bhmf = munge.mass_function(bhm, self.params["Volume"], 30)
 
-        obs = number_density(feature="BHMF", z_target=z, h=self.params["Hubble_h"], quiet=True)
-
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
-        alpha = 0.6
-        props = cycler.cycler(marker=("o", "s", "H", "P", "*", "^", "v", "<", ">"))
-        for ii, prop in zip(range(obs.n_target_observation), props):
-            data = obs.target_observation["Data"][ii]
-            label = obs.target_observation.index[ii]
-            datatype = obs.target_observation["DataType"][ii]
-            data[:, 1:] = np.log10(data[:, 1:])
-            if datatype == "data":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=[data[:, 1] - data[:, 3], data[:, 2] - data[:, 1]],
-                    label=label,
-                    ls="",
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            elif datatype == "dataULimit":
-                ax.errorbar(
-                    data[:, 0],
-                    data[:, 1],
-                    yerr=-0.2 * data[:, 1],
-                    uplims=True,
-                    label=label,
-                    mec="w",
-                    alpha=alpha,
-                    **prop,
-                )
-            else:
-                ax.plot(data[:, 0], data[:, 1], label=label, lw=3, alpha=alpha)
-                ax.fill_between(data[:, 0], data[:, 2], data[:, 3], alpha=0.4)
+        fig, ax = _subplots(ax)
+        _plot_observations(ax, "BHMF", z, self.params["Hubble_h"])
 
         ax.plot(
             bhmf[:, 0], np.log10(bhmf[:, 1]), ls="-", color="k", lw=4, label="Meraxes run",
@@ -775,14 +781,11 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / f"bhmf_z{redshift:.2f}.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, f"bhmf_z{redshift:.2f}.pdf")
 
         return fig, ax
 
-    def plot_sfr_evo(self, sfr_evo: np.ndarray = None):
+    def plot_sfr_evo(self, sfr_evo: np.ndarray = None, ax: Union[plt.Axes, None] = None):
         """Plot the star formation rate evolution (Madau-Lilly plot).
 
         Parameters
@@ -790,6 +793,8 @@ class MeraxesOutput:
         sfr_evo : np.ndarray, optional
             The total star formation rate for each snapshot (already read in). If not supplied, the necessary
             galaxy properties will be read in.
+        ax : matplotlib.Axes, optional
+            An existing axis to clear and draw the plot on. (default: create a new figure)
 
         Returns
         -------
@@ -811,7 +816,7 @@ class MeraxesOutput:
 
         sfrf = np.log10(sfr_evo / self.params["Volume"])
 
-        fig, ax = plt.subplots(1, 1, tight_layout=True)
+        fig, ax = _subplots(ax)
         ax.plot(
             self.zlist, sfrf, ls="-", color="k", lw=4, label="Meraxes run",
         )
@@ -826,20 +831,121 @@ class MeraxesOutput:
         )
 
         if self.save:
-            self.plot_dir.mkdir(exist_ok=True)
-            sns.despine(ax=ax)
-            fname = self.plot_dir / "sfr_evo.pdf"
-            plt.savefig(fname)
+            self._savefig(fig, ax, "sfr_evo.pdf")
 
         return fig, ax
 
 
+def _plot_redshift(
+    meraxes_output: MeraxesOutput,
+    redshift: float,
+    uvindex: Union[int, None] = None,
+    imfscaling: float = 1.0,
+    ax: Union[plt.Axes, None] = None,
+):
+    """Create all of the plots for a single redshift, returning a list of their (fig, ax) tuples."""
+    props = [
+        "StellarMass",
+        "Sfr",
+        "HIMass",
+        "BlackHoleMass",
+        "BlackHoleAccretedHotMass",
+        "BlackHoleAccretedColdMass",
+        "dt",
+    ]
+
+    try:
+        snap, _ = meraxes_output._check_for_redshift(redshift)
+        with h5.File(meraxes_output.fname, "r") as fin:
+            # the magnitudes for the UV LF aren't always present, but if they are then read them along with everything
+            # else rather than having plot_uvlf read them separately
+            with_mags = redshift >= 4 and "DustyMags" in _galaxy_dtype(fin["Snap%03d" % snap]).names
+            if with_mags:
+                props.append("DustyMags")
+
+            # each plot only uses a few of the properties, so hand them out as contiguous arrays
+            gals = read_gals(fin, snap, props=props, columnar=True)
+    except KeyError:
+        return []
+
+    plots = []
+    plots.append(meraxes_output.plot_smf(redshift, imfscaling=imfscaling, gals=gals, ax=ax))
+    plots.append(meraxes_output.plot_sfrf(redshift, imfscaling=imfscaling, gals=gals, ax=ax))
+    plots.append(meraxes_output.plot_bhmf(redshift, gals=gals, ax=ax))
+    plots.append(meraxes_output.plot_bolometric_qlf(redshift, gals=gals, ax=ax))
+
+    if redshift == 0:
+        plots.append(meraxes_output.plot_HImf(redshift, gals=gals, ax=ax))
+
+    if redshift >= 4:
+        plots.append(meraxes_output.plot_uvlf(redshift, uvindex, gals=gals if with_mags else None, ax=ax))
+
+    return plots
+
+
+def _plot_evolution(meraxes_output: MeraxesOutput, ax: Union[plt.Axes, None] = None):
+    """Create the plots of quantities across all snapshots, returning a list of their (fig, ax) tuples."""
+    plots = [meraxes_output.plot_sfr_evo(ax=ax), meraxes_output.plot_xHI(ax=ax)]
+    # this adds a colorbar to the figure, so always gets a fresh one
+    plots.append(meraxes_output.plot_21cmPS())
+    return plots
+
+
+def _close_figures(plots: list, ax: Union[plt.Axes, None] = None):
+    """Close the figures of `plots`, apart from the one holding the shared axis `ax`, and return an empty list."""
+    import matplotlib.pyplot as plt
+
+    for plot in plots:
+        # plots which were skipped are empty lists
+        if plot and (ax is None or plot[0] is not ax.figure):
+            plt.close(plot[0])
+
+    return []
+
+
+def _init_worker(rc: dict, warning_filters: list):
+    """Set up matplotlib and the warning filters in a worker process to match the parent's settings."""
+    import warnings
+
+    import matplotlib.pyplot as plt
+
+    # registers seaborn's colormaps, which the parent's rcParams may refer to (e.g. `image.cmap` after `sns.set`)
+    import seaborn  # noqa: F401
+
+    plt.switch_backend("Agg")
+    plt.rcParams.update(rc)
+    warnings.filters[:] = warning_filters
+
+
+def _save_redshift(
+    redshift: float,
+    meraxes_fname: Union[str, Path],
+    output_dir: Union[str, Path],
+    uvindex: Union[int, None] = None,
+    imfscaling: float = 1.0,
+):
+    """Save all of the plots for a single redshift from a worker process.
+
+    The `MeraxesOutput` is created here rather than being passed in as its constructor also sets up the Hubble
+    correction for `read_gals` in this process.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = _subplots()
+    _plot_redshift(MeraxesOutput(meraxes_fname, output_dir, save=True), redshift, uvindex, imfscaling, ax)
+    plt.close(fig)
+
+
 def allplots(
     meraxes_fname: Union[str, Path],
     output_dir: Union[str, Path],
     uvindex: Union[int, None] = None,
     save: bool = False,
     imfscaling: float = 1.0,
+    reuse_figure: bool = False,
+    n_procs: int = 1,
+    single_pdf: bool = False,
+    close_figures: bool = False,
 ):
     """Create all plots.
 
@@ -853,50 +959,79 @@ def allplots(
         Set to `True` to save output. (default: False)
     imfscaling : float
         Scaling for IMF from Salpeter (Mstar[model] = Mstar[Salpeter] * imfscaling) (default: 1.0)
+    reuse_figure : bool
+        Clear and redraw a single figure for (almost) every plot rather than creating a new one each time. This is
+        faster when saving the plots, but most of the returned (fig, ax) tuples will then refer to that one figure.
+        (default: False)
+    n_procs : int
+        The number of processes to use for the plots at each redshift. This is only used if `save` is `True`, and the
+        per-redshift plots are then saved by the worker processes and not returned. The plots of the evolution across
+        all snapshots are drawn by this process while the workers are busy. (default: 1)
+    single_pdf : bool
+        Save all of the plots as the pages of a single PDF, `output_dir/all.pdf`, rather than as individual files. This
+        is quicker to write, but can't be combined with `n_procs` > 1. (default: False)
+    close_figures : bool
+        Close the figures as soon as they have been drawn (and saved) instead of returning them, so that the memory use
+        doesn't grow with the number of plots. (default: False)
 
     Returns
     -------
     plots: list
         A list of tuples of matplotlib (fig, ax) for each plot.
     """
-    meraxes_output = MeraxesOutput(meraxes_fname, output_dir, save)
+    if save and single_pdf and n_procs > 1:
+        raise ValueError("Plots can only be saved to a single PDF from one process.")
 
-    plots = []
-    for redshift in (8, 7, 6, 5, 4, 3, 2, 1, 0.5, 0):
-        gals = None
-        try:
-            snap, _ = check_for_redshift(meraxes_fname, redshift)
-            gals = read_gals(
-                meraxes_fname,
-                snap,
-                props=[
-                    "StellarMass",
-                    "Sfr",
-                    "HIMass",
-                    "BlackHoleMass",
-                    "BlackHoleAccretedHotMass",
-                    "BlackHoleAccretedColdMass",
-                    "dt",
-                ],
-            )
-        except KeyError:
-            continue
+    meraxes_output = MeraxesOutput(meraxes_fname, output_dir, save)
 
-        plots.append(meraxes_output.plot_smf(redshift, imfscaling=imfscaling, gals=gals))
-        plots.append(meraxes_output.plot_sfrf(redshift, imfscaling=imfscaling, gals=gals))
-        plots.append(meraxes_output.plot_bhmf(redshift, gals=gals))
-        plots.append(meraxes_output.plot_bolometric_qlf(redshift, gals=gals))
+    pdf = None
+    if save and single_pdf:
+        from matplotlib.backends.backend_pdf import PdfPages
 
-        if redshift == 0:
-            plots.append(meraxes_output.plot_HImf(redshift, gals=gals))
+        pdf = meraxes_output.pdf = PdfPages(meraxes_output.plot_dir / "all.pdf")
 
-        if redshift >= 4:
-            # we don't pass gals here as the presence of mags is not guaranteed
-            plots.append(meraxes_output.plot_uvlf(redshift, uvindex))
+    ax = _subplots()[1] if reuse_figure else None
+    redshifts = (8, 7, 6, 5, 4, 3, 2, 1, 0.5, 0)
 
-    plots.append(meraxes_output.plot_sfr_evo())
-    plots.append(meraxes_output.plot_xHI())
-    plots.append(meraxes_output.plot_21cmPS())
+    plots = []
+    try:
+        if save and n_procs > 1:
+            import warnings
+            from concurrent.futures import ProcessPoolExecutor
+            from functools import partial
+
+            import matplotlib.pyplot as plt
+
+            rc = {key: value for key, value in plt.rcParams.items() if key != "backend"}
+            save_redshift = partial(
+                _save_redshift,
+                meraxes_fname=meraxes_fname,
+                output_dir=output_dir,
+                uvindex=uvindex,
+                imfscaling=imfscaling,
+            )
+            # the workers don't inherit any warning filters set by the caller (e.g. by `main`), so pass them on
+            initargs = (rc, list(warnings.filters))
+            with ProcessPoolExecutor(max_workers=n_procs, initializer=_init_worker, initargs=initargs) as executor:
+                results = executor.map(save_redshift, redshifts)
+                # draw the evolution plots while the workers are busy
+                plots.extend(_plot_evolution(meraxes_output, ax))
+                # consume the results to raise any exceptions from the workers
+                list(results)
+        else:
+            for redshift in redshifts:
+                plots.extend(_plot_redshift(meraxes_output, redshift, uvindex, imfscaling, ax))
+                if close_figures:
+                    plots = _close_figures(plots, ax)
+            plots.extend(_plot_evolution(meraxes_output, ax))
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+    if close_figures:
+        plots = _close_figures(plots)
+        if ax is not None:
+            _close_figures([(ax.figure, ax)])
 
     return plots
 
@@ -911,13 +1046,22 @@ def allplots(
     help="Scaling for IMF from Salpeter (Mstar[IMF] = Mstar[Salpeter] * imfscaling).",
     default=1.0,
 )
-def main(meraxes_fname, output_dir="plots", uvindex=None, imfscaling=1.0):
-    import os
+@click.option(
+    "--nprocs", "-n", type=click.INT, help="Number of processes to use for the per-redshift plots.", default=1,
+)
+@click.option("--single-pdf", is_flag=True, help="Save all of the plots to a single multi-page PDF.")
+def main(meraxes_fname, output_dir="plots", uvindex=None, imfscaling=1.0, nprocs=1, single_pdf=False):
     import warnings
 
-    logging.basicConfig(
-        level=os.getenv("LOG_LEVEL", "INFO"), handlers=logging.getLogger("dragons").handlers,
-    )
+    import matplotlib
+
+    # we only ever write the plots to file, so there is no need for an interactive backend (selecting it before pyplot
+    # is imported means no other backend is ever resolved)
+    matplotlib.use("Agg")
+
+    import seaborn as sns
+
+    setup_logging(os.getenv("LOG_LEVEL", "INFO"))
     logging.getLogger("dragons.meraxes.io").setLevel("ERROR")
 
     sns.set(
@@ -926,7 +1070,17 @@ def main(meraxes_fname, output_dir="plots", uvindex=None, imfscaling=1.0):
 
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=RuntimeWarning, module=__name__)
-        allplots(meraxes_fname, output_dir, uvindex, True, imfscaling=imfscaling)
+        allplots(
+            meraxes_fname,
+            output_dir,
+            uvindex,
+            True,
+            imfscaling=imfscaling,
+            reuse_figure=True,
+            n_procs=nprocs,
+            single_pdf=single_pdf,
+            close_figures=True,
+        )
 
 
 if __name__ == "__main__":
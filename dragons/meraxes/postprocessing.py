@@ -1,4 +1,6 @@
 import logging
+from functools import partial
+
 import numpy as np
 from astropy import units as U, constants as C
 
@@ -6,7 +8,13 @@ logging.getLogger(__name__)  # noqa
 
 
 def bh_bolometric_mags(
-    gals: np.ndarray, simprops: dict, eta=0.06, quasarVoLScaling=0.0, seed=None, consider_opening_angle=False,
+    gals: np.ndarray,
+    simprops: dict,
+    eta=0.06,
+    quasarVoLScaling=0.0,
+    seed=None,
+    consider_opening_angle=False,
+    rng: np.random.Generator = None,
 ):
     """Calculate the black hole bolometric magnitude for a set of galaxies.
 
@@ -27,6 +35,10 @@ def bh_bolometric_mags(
     consider_opening_angle : bool, optional (default: False)
         Should we consider a random orientation for each QSO and decide if we can observe it based on the opening angle?
         Note that `consider_opening_angle = True` by default if `quasarVoLScaling > 0.0`. See also the note below.
+    rng : numpy.random.Generator, optional
+        The random number generator to use. The random numbers are then drawn in single precision, which is plenty
+        for these uniform draws. If not given then the global numpy RNG is used (seeded with `seed`), which is slower
+        but reproduces the results of earlier versions for a given seed.
 
     Note
     ----
@@ -37,26 +49,31 @@ def bh_bolometric_mags(
     (1.0 - np.cos(np.deg2rad(simprops['quasar_open_angle']) / 2.0)).
     """
 
-    #  BHM:              blackhole mass in the end (solar mass)
-    #  accretedHotBHM:   accreted blackhole mass during radio mode in this time step (solar mass)
-    #  accretedColdBHM:  accreted blackhole mass during quasar mode in this time step (solar mass)
+    #  BHM:              blackhole mass in the end (1e10 solar mass)
+    #  accretedHotBHM:   accreted blackhole mass during radio mode in this time step (1e10 solar mass)
+    #  accretedColdBHM:  accreted blackhole mass during quasar mode in this time step (1e10 solar mass)
     #  delta_t:          time interval of this snapshot (1e6Myr)
     #  eta:              accretion efficiency
     #  quasarVoL:        quasar view of line range (degree)
     #  quasarVoLScaling: quasar view of line range Scaling (for the purpose of BHM dependent quasarVoL)
     #  EddingtonRatio:   EddingtonRatio (taken from the simulation!)
 
-    SOLARM2L = 14729390.502926536  # (1*units.Msun*constants.c**2./units.Myr)
+    # the masses are kept in the Meraxes units of 1e10 Msun, with the factor of 1e10 folded in to this constant
+    SOLARM2L = 14729390.502926536 * 1e10  # (1e10*units.Msun*constants.c**2./units.Myr)
 
     EddingtonRatio = simprops["EddingtonRatio"]
     quasarVoL = simprops["quasar_open_angle"]
-    BHM = gals["BlackHoleMass"] * 1e10
-    accretedHotBHM = gals["BlackHoleAccretedHotMass"] * 1e10
-    accretedColdBHM = gals["BlackHoleAccretedColdMass"] * 1e10
+    BHM = gals["BlackHoleMass"]
+    accretedHotBHM = gals["BlackHoleAccretedHotMass"]
+    accretedColdBHM = gals["BlackHoleAccretedColdMass"]
     delta_t = gals["dt"]
 
-    if seed:
-        np.random.seed(seed=seed)
+    if rng is None:
+        if seed:
+            np.random.seed(seed=seed)
+        random = np.random.random
+    else:
+        random = partial(rng.random, dtype=np.float32)
 
     # the stochasticity is included as following:
     # since we assume BH accretes under a constant EddingtonRatio,
@@ -64,42 +81,70 @@ def bh_bolometric_mags(
     # therefore, we generage a random number, glow_time, between 0 and the snapshot time interval.
     # then the observed luminosity is the luminosity at glow_time
     # however, if glow_time is larger than the total time of accretion, accretion_time, we cannot see it
-    glow_time = np.random.random(BHM.size) * delta_t
-
-    m0 = BHM - (1.0 - eta) * accretedColdBHM  # get initial mass before accretion
+    glow_time = random(BHM.size)
 
     # similarly, we assume quasar radiation is limited within a small angel, quasarVoL
     # we can only observe it if the view of line is within quasarVoL
-    flag_undetected = np.zeros(BHM.size, bool)
-    if consider_opening_angle or quasarVoLScaling > 0.0:
-        angle = np.random.random(BHM.size)
-        solid_angle = 1.0 - np.cos(np.deg2rad(quasarVoL) / 2.0)  # normalized to 2pi
+    consider_opening_angle = consider_opening_angle or quasarVoLScaling > 0.0
+    if consider_opening_angle:
+        angle = random(BHM.size)
+
+    # Meraxes stores the masses in single precision, which is plenty for magnitudes, so we work in the precision of
+    # the inputs (at least single) rather than promoting everything to double
+    dtype = np.result_type(BHM, accretedHotBHM, accretedColdBHM, delta_t, np.float32)
+    n_gals = BHM.size
+
+    # only black holes which accreted in quasar mode have a non-zero duty cycle, and therefore luminosity, so the rest
+    # are left undetected (the random numbers above are still drawn for every galaxy so that the results for a given
+    # seed do not depend on this)
+    active = np.flatnonzero(accretedColdBHM > 0)
+    BHM = BHM[active].astype(dtype, copy=False)
+    accretedHotBHM = accretedHotBHM[active].astype(dtype, copy=False)
+    accretedColdBHM = accretedColdBHM[active].astype(dtype, copy=False)
+    delta_t = delta_t[active].astype(dtype, copy=False)
+    glow_time = glow_time[active].astype(dtype, copy=False)
+    glow_time *= delta_t
+
+    m0 = (eta - 1.0) * accretedColdBHM
+    m0 += BHM  # get initial mass before accretion
+    growth_timescale = eta * 450.0 / EddingtonRatio  # the e-folding time of the mass growth (Myr)
+    growth = glow_time * (1.0 / growth_timescale)
+    np.exp(growth, out=growth)  # the mass growth factor at glow_time
+
+    flag_undetected = None  # everything is detected unless we consider the opening angle
+    if consider_opening_angle:
+        angle = angle[active]
+        # normalized to 2pi (this stays a scalar unless it depends on the mass)
+        solid_angle = 1.0 - np.cos(np.deg2rad(quasarVoL) / 2.0)
         if quasarVoLScaling != 0:
-            solid_angle *= (
-                m0 * np.exp(EddingtonRatio * glow_time / eta / 450.0) / 1e8
-            ) ** quasarVoLScaling  # if quasarVoL depends on the mass
-            solid_angle[solid_angle > 1] = 1.0
+            solid_angle *= (m0 * growth * 100.0) ** quasarVoLScaling  # if quasarVoL depends on the mass (/1e8 Msun)
+            np.minimum(solid_angle, 1.0, out=solid_angle)
         flag_undetected = angle > solid_angle  # flag_undetected=True means we cannot see this quasar
 
     # quasar mode
-    accretion_timeq = np.log(accretedColdBHM / m0 + 1.0) * eta * 450.0 / EddingtonRatio  # get the accretion time
-    QuasarLuminosity = (
-        SOLARM2L * EddingtonRatio * m0 * np.exp(EddingtonRatio * glow_time / eta / 450.0) / 450.0
-    )  # get the luminosity at glow_time
+    # the luminosity at glow_time is SOLARM2L * eta * m0 * growth / growth_timescale
+    accretion_timeq = np.divide(accretedColdBHM, m0)
+    accretion_timeq += 1.0
+    np.log(accretion_timeq, out=accretion_timeq)  # get the accretion time (in units of growth_timescale)
 
     # radio mode
-    # do the same for radio mode, this is not significant at high-z
-    m0 -= (1.0 - eta) * accretedHotBHM
-    AGNLuminosity = SOLARM2L * EddingtonRatio * m0 * np.exp(EddingtonRatio * glow_time / eta / 450.0) / 450.0
+    # do the same for radio mode (with m0 -> m0 - (1 - eta) * accretedHotBHM), this is not significant at high-z
 
     # we can also return luminosity of all black holes as well as the duty cycle factors, which can be
     # included as weights when calculating the LFs
     # !!! INCONSISTENCE of the accretion time, now since AGN luminosity is actually not used, so always use
     # quasar mode accretion time to represent the duty cycle!!!!!
-    Lbol = (QuasarLuminosity + AGNLuminosity) * accretion_timeq / delta_t
-    Lbol[flag_undetected] = 0.0
+    # both luminosities share the growth factor, so we sum their initial masses and the growth_timescale cancels
+    Lbol = 2.0 * m0
+    Lbol -= (1.0 - eta) * accretedHotBHM
+    Lbol *= growth
+    Lbol *= accretion_timeq
+    Lbol *= SOLARM2L * eta / delta_t
+    if flag_undetected is not None:
+        Lbol[flag_undetected] = 0.0
+    Mbol = np.full(n_gals, np.inf, dtype=dtype)
     with np.errstate(divide="ignore"):
-        Mbol = 4.74 - 2.5 * np.log10(Lbol)
+        Mbol[active] = 4.74 - 2.5 * np.log10(Lbol)
 
     return Mbol
 
@@ -114,17 +159,29 @@ def bh_radio_lum(gals: np.ndarray):
     SPIN = 0.083  # NB This corresponds to ε=0.06
     FREQ = 1.4e9  # Hz
 
+    # the Eddington accretion rate (L_Edd / c^2) of a 1e9 Msun black hole
+    MDOT_EDD = (1e9 * U.Msun * 4.0 * np.pi * C.G * C.m_p / (C.c * C.sigma_T)).to("1e9 Msun Myr-1").value
+
     m_bh = gals["BlackHoleMass"] * 10.0  # 1e9 Msun
     mdot_acc_hot = gals["BlackHoleAccretedHotMass"] * 10 / gals["dt"]  # 1e9 Msun / Myr
-    mdot_edd = (m_bh * 1e9 * U.Msun * 4.0 * np.pi * U.G * C.m_p * C.c / C.sigma_T).to("1e9 Msun Myr-1").value
-    mdot_ratio = mdot_acc_hot / mdot_edd  # unitless
-
-    Ljet_radio = 2.0e45 * m_bh * (mdot_ratio / 0.01) * SPIN ** 2  # erg s-1
-    νL_radio = ARADIO * (m_bh * (mdot_ratio / 0.01)) ** 0.42 * Ljet_radio  # W
-    νL_qso = AQSO * m_bh ** 1.42 * 2.5e43 * SPIN ** 2  # W
 
-    L_tot = (νL_radio + νL_qso) / FREQ  # W Hz-1
+    # with mdot_ratio = mdot_acc_hot / (m_bh * MDOT_EDD), the black hole mass cancels in
+    # Ljet_radio = 2.0e45 * m_bh * (mdot_ratio / 0.01) * SPIN ** 2  # erg s-1
+    # νL_radio = ARADIO * (m_bh * (mdot_ratio / 0.01)) ** 0.42 * Ljet_radio  # W
+    # so we fold all of the constants together
+    νL_radio = mdot_acc_hot
+    νL_radio *= 100.0 / MDOT_EDD
+    νL_radio **= 1.42
+    νL_radio *= ARADIO * 2.0e45 * SPIN ** 2 / FREQ  # W Hz-1
+
+    # νL_qso = AQSO * m_bh ** 1.42 * 2.5e43 * SPIN ** 2  # W
+    νL_qso = m_bh
+    νL_qso **= 1.42
+    νL_qso *= AQSO * 2.5e43 * SPIN ** 2 / FREQ  # W Hz-1
+
+    L_tot = νL_radio
+    L_tot += νL_qso
     with np.errstate(divide="ignore"):
-        L_tot = np.log10()
+        np.log10(L_tot, out=L_tot)
 
     return L_tot
@@ -3,9 +3,7 @@
 
 """Routines for reionisation related calculations."""
 
-import warnings
 import numpy as np
-from scipy import integrate
 from astropy import cosmology
 from astropy import units as U
 from astropy import constants as C
@@ -47,15 +45,18 @@ def electron_optical_depth(fname, volume_weighted=False):
         Ob0=run_params["OmegaM"] * run_params["BaryonFrac"],
     )
 
-    # define the necessary constants
-    thomson_cross_section = 6.652e-25 * U.cm * U.cm
-    density_H = 1.88e-7 * cosmo.Ob0 * cosmo.h ** 2 / 0.022 * U.cm ** -3
-    # density_He = 0.19e-7 * cosmo.Ob0 * cosmo.h**2 / 0.022 * U.cm**-3
+    # define the necessary constants (as plain floats in cgs units so that the
+    # integrands below are evaluated on bare arrays rather than Quantities)
+    thomson_cross_section = 6.652e-25  # cm^2
+    density_H = 1.88e-7 * cosmo.Ob0 * cosmo.h ** 2 / 0.022  # cm^-3
+    # density_He = 0.19e-7 * cosmo.Ob0 * cosmo.h**2 / 0.022  # cm^-3
     # Not what is in Whythe et al.!
-    density_He = 0.148e-7 * cosmo.Ob0 * cosmo.h ** 2 / 0.022 * U.cm ** -3
+    density_He = 0.148e-7 * cosmo.Ob0 * cosmo.h ** 2 / 0.022  # cm^-3
+    speed_of_light = C.c.cgs.value  # cm s^-1
+    hubble_constant = cosmo.H0.to(1 / U.s).value  # s^-1
 
     def cosmo_factor(z):
-        return C.c * (1 + z) ** 2 / cosmo.H(z) * thomson_cross_section
+        return speed_of_light * (1 + z) ** 2 / (hubble_constant * cosmo.efunc(z)) * thomson_cross_section
 
     # read in the model run data
     snaps, z_list, _ = read_snaplist(fname)
@@ -79,25 +80,28 @@ def electron_optical_depth(fname, volume_weighted=False):
         N.B. THIS ASSUMES THAT THE NEUTRAL FRACTION IS ZERO BY THE END OF THE
         INPUT RUN!
         """
-        if z <= 4:
-            return (cosmo_factor(z) * (density_H + 2.0 * density_He)).decompose()
-        else:
-            return (cosmo_factor(z) * (density_H + density_He)).decompose()
+        return cosmo_factor(z) * (density_H + (1 + (z <= 4)) * density_He)
 
     def d_te_sim(z, xHII):
         """This is d/dz scattering depth for redshifts covered by the run.
         """
         prefac = cosmo_factor(z)
-        return (prefac * (density_H * xHII + (1 + (z <= 4)) * density_He * xHII)).decompose()
-
-    post_sim_contrib = integrate.quad(d_te_postsim, 0, z_list[0])[0]
-
+        return prefac * (density_H * xHII + (1 + (z <= 4)) * density_He * xHII)
+
+    # the integrand is smooth apart from the helium step at z=4, so integrate
+    # either side of it with a fixed order Gauss-Legendre rule
+    nodes, weights = np.polynomial.legendre.leggauss(32)
+    post_sim_contrib = 0.0
+    for z_lo, z_hi in ((0.0, min(z_list[0], 4.0)), (4.0, max(z_list[0], 4.0))):
+        half_width = 0.5 * (z_hi - z_lo)
+        z_post = half_width * nodes + 0.5 * (z_hi + z_lo)
+        post_sim_contrib += half_width * np.dot(weights, d_te_postsim(z_post))
+
+    # evaluate the integrand once and accumulate the partial integrals up to
+    # each snapshot with the trapezoidal rule
+    d_te = d_te_sim(z_list, xHII)
     sim_contrib = np.zeros(z_list.size)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        sim_contrib = np.array(
-            [integrate.simps(d_te_sim(z_list[: ii + 1], xHII[: ii + 1]), z_list[: ii + 1]) for ii in range(z_list.size)]
-        )
+    np.cumsum(0.5 * (d_te[1:] + d_te[:-1]) * np.diff(z_list), out=sim_contrib[1:])
 
     scattering_depth = sim_contrib + post_sim_contrib
 
@@ -3,9 +3,10 @@
 
 """A collection of functions for doing common processing tasks."""
 
-import re
+from collections import namedtuple
 import numpy as np
 from pandas import DataFrame
+from scipy import fft
 from scipy.stats import describe as sp_describe
 from .tophat_filter import tophat_filter
 
@@ -14,6 +15,8 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel("WARNING")
 
+_DescribeResult = namedtuple("DescribeResult", ("nobs", "minmax", "mean", "variance", "skewness", "kurtosis"))
+
 
 def pretty_print_dict(d, fmtlen=30):
 
@@ -33,13 +36,13 @@ def pretty_print_dict(d, fmtlen=30):
 
     for k, v in d.items():
         if isinstance(v, dict):
-            print(fmtstr_title % (k.upper(), re.sub("\S", "-", k)))
+            print(fmtstr_title % (k.upper(), "-" * len(k)))
             pretty_print_dict(v)
         else:
             print(fmtstr % k, v)
 
 
-def ndarray_to_dataframe(arr, drop_vectors=False):
+def ndarray_to_dataframe(arr, drop_vectors=False, copy=True):
 
     """Convert numpy ndarray to a pandas DataFrame, dealing with N(>1)
     dimensional datatypes.
@@ -52,6 +55,11 @@ def ndarray_to_dataframe(arr, drop_vectors=False):
     drop_vectors : bool
         only include single value datatypes in output DataFrame
 
+    copy : bool
+        copy the data in to the DataFrame.  If False then the DataFrame
+        columns are views of `arr`, which avoids duplicating it in memory but
+        means that the two share their data.  (default: True)
+
     Returns
     -------
     df : DataFrame
@@ -64,21 +72,25 @@ def ndarray_to_dataframe(arr, drop_vectors=False):
         if len(v[0].shape) == 0:
             names.append(k)
 
-    # Create a new dataframe with these columns
-    df = DataFrame(arr[names])
+    # Collect these columns
+    columns = {k: arr[k] for k in names}
 
     if not drop_vectors:
-        # Loop through each N(>1)D property and append each dimension as
-        # its own column in the dataframe
+        # Loop through each N(>1)D property and add each dimension as its
+        # own column
         for k, v in arr.dtype.fields.items():
             if len(v[0].shape) == 1:
+                vector = arr[k]
                 for i in range(v[0].shape[0]):
-                    df[k + "_%d" % i] = arr[k][:, i]
+                    columns[k + "_%d" % i] = vector[:, i]
+
+    # Create the dataframe in one go rather than growing it column by column
+    df = DataFrame(columns, copy=copy)
 
     return df
 
 
-def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_edges=False, **kwargs):
+def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_edges=False, out=None, **kwargs):
     """Generate a mass function.
 
     Parameters
@@ -90,7 +102,10 @@ def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_e
         volume of simulation cube/subset
 
     bins : int or list or str
-        passed to numpy.histogram
+        passed to numpy.histogram.  Prefer an int or the name of a bin width
+        estimator (e.g. 'fd') where possible: numpy then computes each bin
+        index directly from the (equal) bin width instead of searching the
+        edges.
 
     range : len=2 list or array
         range of data to be used for mass function
@@ -101,6 +116,11 @@ def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_e
     return_edges : bool
         return the bin_edges (default: False)
 
+    out : ndarray
+        array of shape (n_bins, 2), or (n_bins, 3) if poisson_uncert=True,
+        to write the mass function in to instead of allocating a new one
+        (default: None)
+
     \*\*kwargs
         passed to numpy.histogram
 
@@ -112,27 +132,29 @@ def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_e
         If return_edges=True then the bin edges are also returned.
     """
 
-    if "normed" in kwargs:
-        kwargs["normed"] = False
-        logger.warn("Turned off normed kwarg in mass_function()")
+    # numpy.histogram no longer accepts normed, so drop it rather than pass it on
+    if kwargs.pop("normed", None) is not None:
+        logger.warning("Turned off normed kwarg in mass_function()")
 
     if range is not None and isinstance(bins, str):
-        mass = mass[(mass >= range[0]) & (mass <= range[1])]
+        # build the mask in place rather than and-ing two temporary masks
+        keep = mass >= range[0]
+        keep &= mass <= range[1]
+        mass = mass[keep]
 
     vals, edges = np.histogram(mass, bins, range, **kwargs)
-    width = edges[1] - edges[0]
-    radius = width / 2.0
-    centers = edges[:-1] + radius
-    if poisson_uncert:
-        uncert = np.sqrt(vals.astype(float))
 
-    vals = vals.astype(float) / (volume * width)
+    if out is None:
+        out = np.empty((vals.size, 3 if poisson_uncert else 2))
 
-    if not poisson_uncert:
-        mf = np.dstack((centers, vals)).squeeze()
-    else:
-        uncert /= volume * width
-        mf = np.dstack((centers, vals, uncert)).squeeze()
+    # fill the columns in place rather than stacking new arrays
+    _, width = edges_to_centers(edges, width=True, out=out[:, 0])
+    np.divide(vals, volume * width, out=out[:, 1])
+    if poisson_uncert:
+        np.sqrt(vals, out=out[:, 2])
+        out[:, 2] /= volume * width
+
+    mf = out.squeeze()
 
     if not return_edges:
         return mf
@@ -140,7 +162,7 @@ def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_e
         return mf, edges
 
 
-def edges_to_centers(edges, width=False):
+def edges_to_centers(edges, width=False, out=None):
 
     """Convert **evenly spaced** bin edges to centers.
 
@@ -152,6 +174,10 @@ def edges_to_centers(edges, width=False):
     width : bool
         also return the bin width
 
+    out : ndarray
+        array of size edges.size-1 to write the centers in to instead of
+        allocating a new one (default: None)
+
     Returns
     -------
     centers : ndarray
@@ -163,7 +189,7 @@ def edges_to_centers(edges, width=False):
 
     bin_width = edges[1] - edges[0]
     radius = bin_width * 0.5
-    centers = edges[:-1] + radius
+    centers = np.add(edges[:-1], radius, out=out)
 
     if width:
         return centers, bin_width
@@ -175,6 +201,10 @@ def describe(arr, **kwargs):
 
     """Run scipy.stats.describe and produce legible output.
 
+    The statistics of a real (integer or floating point) 1D array with no
+    kwargs are calculated directly with numpy (in double precision), which is
+    several times faster for large arrays.
+
     Parameters
     ----------
     arr : ndarray
@@ -185,10 +215,18 @@ def describe(arr, **kwargs):
 
     Returns
     -------
-        output of scipy.stats.describe
+        output of scipy.stats.describe (or, for the numpy fast path, a
+        namedtuple with the same fields)
     """
 
-    stats = sp_describe(arr)
+    arr = np.asarray(arr)
+    # only real values can be accumulated in float64 (complex values would
+    # lose their imaginary part)
+    real = np.issubdtype(arr.dtype, np.integer) or np.issubdtype(arr.dtype, np.floating)
+    if kwargs or arr.ndim != 1 or not real:
+        stats = sp_describe(arr, **kwargs)
+    else:
+        stats = _describe_1d(arr)
 
     print(("{:15s} : {:g}".format("size", stats[0])))
     print(("{:15s} : {:g}".format("min", stats[1][0])))
@@ -201,6 +239,26 @@ def describe(arr, **kwargs):
     return stats
 
 
+def _describe_1d(arr):
+    # The default scipy.stats.describe of a 1D array, but reusing a single array of deviations from the mean for all
+    # of the central moments rather than recomputing them for each statistic.
+    nobs = arr.size
+    mean = arr.mean(dtype=np.float64)
+
+    dev = arr - mean
+    dev_pow = dev * dev
+    m2 = dev_pow.mean()
+    dev_pow *= dev
+    m3 = dev_pow.mean()
+    dev_pow *= dev
+    m4 = dev_pow.mean()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _DescribeResult(
+            nobs, (arr.min(), arr.max()), mean, m2 * nobs / (nobs - 1.0), m3 / m2 ** 1.5, m4 / m2 ** 2 - 3.0,
+        )
+
+
 def smooth_grid(grid, side_length, radius, filt="tophat"):
     """Smooth a grid by convolution with a filter.
 
@@ -219,7 +277,8 @@ def smooth_grid(grid, side_length, radius, filt="tophat"):
     Returns
     -------
     smoothed_grid : ndarray
-        The smoothed grid.
+        The smoothed grid.  This is single precision if the input grid is,
+        and double precision otherwise.
     """
 
     # The tuple of implemented filters
@@ -231,8 +290,12 @@ def smooth_grid(grid, side_length, radius, filt="tophat"):
 
     side_length, radius = float(side_length), float(radius)
 
-    # Do the forward fft
-    grid = np.fft.rfftn(grid)
+    # Do the forward fft (single precision grids stay in single precision and
+    # everything else is done in double precision, as required by tophat_filter)
+    grid = np.asarray(grid)
+    if grid.dtype != np.float32:
+        grid = grid.astype(np.float64, copy=False)
+    grid = fft.rfftn(grid, workers=-1)
 
     #  # Construct a grid of k*radius values
     #  k = 2.0 * np.pi * np.fft.fftfreq(grid.shape[0],
@@ -250,7 +313,7 @@ def smooth_grid(grid, side_length, radius, filt="tophat"):
 
     # Inverse transform back to real space
     #  grid = np.fft.irfftn(fgrid).real
-    grid = np.fft.irfftn(grid).real
+    grid = fft.irfftn(grid, workers=-1, overwrite_x=True).real
 
     # Make sure fgrid is marked available for garbage collection
     #  del(fgrid)
@@ -273,7 +336,10 @@ def power_spectrum(grid, side_length, n_bins, dimensional=False):
     Parameters
     ----------
     grid : ndarray
-        The grid from which to construct the power spectrum
+        The grid from which to construct the power spectrum.  The FFT is
+        carried out in the precision of the grid, so a single precision grid
+        (e.g. as returned by :func:`dragons.meraxes.read_grid`) is transformed
+        without being upcast.
 
     side_length : float
         The side length of the grid (assumes all side lengths are equal)
@@ -306,40 +372,42 @@ def power_spectrum(grid, side_length, n_bins, dimensional=False):
     volume = side_length ** 3
 
     # do the FFT (note the normalising 1.0/N_cells factor)
-    ft_grid = np.fft.rfftn(grid) / float(grid.size)
-
-    # generate a grid of k magnitudes
-    k1d = 2.0 * np.pi * np.fft.fftfreq(grid.shape[0], 1 / float(grid.shape[0])) / side_length
-    k1d_r = 2.0 * np.pi * np.fft.rfftfreq(grid.shape[0], 1 / float(grid.shape[0])) / side_length
-    k = np.meshgrid(k1d, k1d, k1d_r, sparse=True, indexing="ij")
-    k = np.sqrt(k[0] ** 2 + k[1] ** 2 + k[2] ** 2)
-
-    # bin up the k magnitudes
+    ft_grid = fft.rfftn(grid, workers=-1)
+    ft_grid /= float(grid.size)
+
+    # the wavenumbers are integer multiples of the fundamental mode, so we
+    # generate a grid of the (integer) squared mode numbers, n^2 = (k / k_f)^2,
+    # rather than of the k magnitudes themselves
+    n1d = np.fft.fftfreq(grid.shape[0], 1 / float(grid.shape[0])).astype(np.intp)
+    n1d_r = np.fft.rfftfreq(grid.shape[0], 1 / float(grid.shape[0])).astype(np.intp)
+    n_sq = n1d[:, None, None] ** 2 + n1d[None, :, None] ** 2 + n1d_r[None, None, :] ** 2
+
+    # sum up the number of modes and powers in each n^2 shell in a single pass
+    # each over the grid (every mode in a shell has the same k)
+    n_sq = n_sq.ravel()
+    ft_grid = ft_grid.ravel()
+    ft_sq = ft_grid.real ** 2
+    ft_sq += ft_grid.imag ** 2
+    shell_counts = np.bincount(n_sq)
+    shell_power = np.bincount(n_sq, weights=ft_sq, minlength=shell_counts.size)
+    k_shell = 2.0 * np.pi / side_length * np.sqrt(np.arange(shell_counts.size))
+
+    # bin up the (few) shell k magnitudes
+    k1d_r = 2.0 * np.pi * n1d_r / side_length
     k_edges = np.logspace(np.log10(k1d_r[1]), np.log10(k1d_r[-1]), n_bins + 1)
-    k_bin = np.digitize(k.flat, k_edges) - 1
+    k_bin = np.digitize(k_shell, k_edges) - 1
     np.clip(k_bin, 0, n_bins - 1, k_bin)
-    k_bin.shape = k.shape
-
-    # loop through each k magnitude bin and calculate the mean power, k and
-    # uncert
-    kmean = np.zeros(n_bins)
-    power_dim = np.zeros(n_bins)
-    uncert_dim = np.zeros(n_bins)
-    power = np.zeros(n_bins)
-    uncert = np.zeros(n_bins)
-
-    for ii in range(n_bins):
-
-        sel = k_bin == ii
-        val_dim = np.abs(ft_grid[sel]) ** 2 * volume
-        val = k[sel] ** 3 * np.abs(ft_grid[sel]) ** 2 / (2.0 * np.pi ** 2) * volume
 
-        kmean[ii] = k[sel].mean()
-        power_dim[ii] = val_dim.mean()
-        uncert_dim[ii] = power_dim[ii] / np.sqrt(len(k[sel]))
+    # combine the shells in each bin and calculate the mean power, k and uncert
+    counts = np.bincount(k_bin, weights=shell_counts, minlength=n_bins)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kmean = np.bincount(k_bin, weights=shell_counts * k_shell, minlength=n_bins) / counts
+        power_dim = np.bincount(k_bin, weights=shell_power, minlength=n_bins) * volume / counts
+        uncert_dim = power_dim / np.sqrt(counts)
 
-        power[ii] = val.mean()
-        uncert[ii] = power[ii] / np.sqrt(len(k[sel]))
+        shell_power *= k_shell ** 3
+        power = np.bincount(k_bin, weights=shell_power, minlength=n_bins) * (volume / (2.0 * np.pi ** 2)) / counts
+        uncert = power / np.sqrt(counts)
 
     if dimensional:
         return kmean, power, uncert, power_dim, uncert_dim
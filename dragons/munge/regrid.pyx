@@ -2,8 +2,6 @@
 #cython: wraparound=False
 #cython: language_level=3
 
-from __future__ import division
-
 import numpy as np
 from tqdm import tqdm
 
@@ -14,7 +12,7 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel('WARNING')
 
-def regrid(np.ndarray[np.float32_t, ndim=3] old_grid not None,
+def regrid(const float[:, :, :] old_grid not None,
            int n_cell):
 
     """ Downgrade the resolution of a 3 dimensional grid.
@@ -36,15 +34,21 @@ def regrid(np.ndarray[np.float32_t, ndim=3] old_grid not None,
     cdef int old_dim = old_grid.shape[0]
     cdef float resample_factor = float(n_cell/old_dim)
 
-    cdef np.ndarray[np.float32_t, ndim=3] new_grid = np.zeros([n_cell,n_cell,n_cell], np.float32)
-
-    cdef unsigned int i,j,k, rsi, rsj, rsk
-    for i in tqdm(xrange(old_dim)):
-        for j in xrange(old_dim):
-            for k in xrange(old_dim):
-                rsi = int(i*resample_factor)
-                rsj = int(j*resample_factor)
-                rsk = int(k*resample_factor)
-                new_grid[rsi, rsj, rsk] += old_grid[i,j,k]
+    new_grid = np.zeros([n_cell,n_cell,n_cell], np.float32)
+    cdef float[:, :, ::1] new_view = new_grid
+
+    # the resampled index of each old index is the same along every axis, so
+    # look them up rather than recomputing them for every cell
+    cdef unsigned int[::1] rs = np.empty(old_dim, np.uintc)
+    cdef unsigned int i,j,k, rsi, rsj
+    for i in range(old_dim):
+        rs[i] = int(i*resample_factor)
+
+    for i in tqdm(range(old_dim)):
+        rsi = rs[i]
+        for j in range(old_dim):
+            rsj = rs[j]
+            for k in range(old_dim):
+                new_view[rsi, rsj, rs[k]] += old_grid[i,j,k]
 
     return new_grid
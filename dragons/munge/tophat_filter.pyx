@@ -8,15 +8,20 @@ import numpy as np
 
 cimport numpy as np
 
+ctypedef fused complex_t:
+    float complex
+    double complex
+
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def tophat_filter(complex[:, :, :] grid, double side_length, double radius):
+@cython.cdivision(True)
+def tophat_filter(complex_t[:, :, :] grid, double side_length, double radius):
     """Apply a tophat filter to a fourier space grid.
 
     Parameters
     ----------
-    grid : 3d ndarray with complex dtype
+    grid : 3d ndarray with complex64 or complex128 dtype
     side_length : float
     radius : float
 
@@ -46,18 +51,23 @@ def tophat_filter(complex[:, :, :] grid, double side_length, double radius):
             np.fft.rfftfreq(dim, 1/float(dim)) / side_length
     cdef int n_k = k.shape[0]
     cdef int n_k_r = k_r.shape[0]
-    cdef double k_i, k_j, k_k, kR, val
+    cdef double k_i2, k_ij2, kR, kR2, val
+    cdef double radius2 = radius*radius
     cdef int ii, jj, kk
 
     for ii in range(n_k):
-        k_i = k[ii]
+        k_i2 = k[ii]*k[ii]
         for jj in range(n_k):
-            k_j = k[jj]
+            k_ij2 = k_i2 + k[jj]*k[jj]
             for kk in range(n_k_r):
-                k_k = k_r[kk]
-                kR = sqrt(k_i*k_i + k_j*k_j + k_k*k_k)*radius
-                if kR > 0:
-                    val = 3.0 * (sin(kR)/(kR**3) - cos(kR)/(kR**2))
+                kR2 = (k_ij2 + k_r[kk]*k_r[kk])*radius2
+                if kR2 > 0:
+                    if kR2 < 1e-4:
+                        # use the series expansion to avoid the catastrophic
+                        # cancellation as kR -> 0
+                        val = 1.0 - kR2/10.0 + kR2*kR2/280.0
+                    else:
+                        kR = sqrt(kR2)
+                        val = 3.0 * (sin(kR) - kR*cos(kR)) / (kR2*kR)
                     grid[ii, jj, kk].real = grid[ii, jj, kk].real * val
                     grid[ii, jj, kk].imag = grid[ii, jj, kk].imag * val
-
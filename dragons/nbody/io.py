@@ -3,8 +3,10 @@
 
 """Routines for reading nbody (gbpHalos, gbpTrees etc.) output files."""
 
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 from os import listdir
+import struct
 import numpy as np
 from astropy.utils.decorators import deprecated
 from tqdm import tqdm
@@ -79,7 +81,7 @@ def read_density_grid(fname):
     return read_grid(fname, "density")
 
 
-def read_grid(fname, grid_name):
+def read_grid(fname, grid_name, mmap=False):
     """Read in a real space grid produced by gbpCode.
 
     *Args*:
@@ -90,6 +92,11 @@ def read_grid(fname, grid_name):
             The name of the grid. Must be either `density`, `vx`, `vy`, or
             `vz`.
 
+        mmap : bool
+            Return a read-only memory map of the grid in the file rather than
+            reading it into memory.  Only the parts of the grid which are
+            actually accessed are then read from disk.  (default: False)
+
     *Returns*:
         grid : ndarray
             The requested grid.
@@ -110,29 +117,39 @@ def read_grid(fname, grid_name):
     logger.info("Reading %s grid from %s" % (grid_name, fname))
 
     with open(fname, "rb") as fin:
-        # read the header info
-        n_cell = np.fromfile(fin, "i4", 3)
-        n_cell_total = n_cell.cumprod()[-1]
-        np.fromfile(fin, "f8", 3)  # box_size_grid
-        n_grids = np.fromfile(fin, "i4", 1)[0]
-        np.fromfile(fin, "i4", 1)[0]  # ma_scheme
-
-        skip = True
-        while skip:
+        # read the header info (n_cell, box_size_grid, n_grids, ma_scheme) in
+        # one go
+        header = struct.unpack("=3i3d2i", fin.read(struct.calcsize("=3i3d2i")))
+        n_cell = header[:3]
+        # struct gives python ints, so the byte offsets of large (>= 1024^3)
+        # grids can't overflow int32
+        n_cell_total = n_cell[0] * n_cell[1] * n_cell[2]
+        n_grids = header[6]
+
+        # seek past the other grids without reading them
+        for _ in range(n_grids):
             # read in the identifier
-            read_ident = np.fromfile(fin, "S32", 1)[0][:10].decode("ascii")
-            skip = read_ident != ident
-            if skip:
-                fin.seek(4 * n_cell_total, 1)
-
-        # read in the grid
-        grid = np.fromfile(fin, "<f4", n_cell_total)
+            read_ident = fin.read(32)[:10].decode("ascii")
+            if read_ident == ident:
+                break
+            fin.seek(4 * n_cell_total, 1)
+        else:
+            raise KeyError("No %s grid found in %s" % (grid_name, fname))
+
+        if mmap:
+            offset = fin.tell()
+        else:
+            # read in the grid
+            grid = np.fromfile(fin, "<f4", n_cell_total)
+
+    if mmap:
+        return np.memmap(fname, dtype="<f4", mode="r", offset=offset, shape=n_cell)
 
     grid.shape = n_cell
     return grid
 
 
-def read_halo_catalog(catalog_loc):
+def read_halo_catalog(catalog_loc, columns=None):
 
     """ Read in a halo catalog produced by gbpCode.
 
@@ -140,8 +157,14 @@ def read_halo_catalog(catalog_loc):
         catalog_loc : str
             Full path to input catalog file or directory
 
+        columns : list
+            Names of the halo properties to read.  If given, only these
+            properties are copied out of the files and the catalog is
+            returned as a dict of (contiguous) arrays keyed by name.
+            (default: None - read all properties)
+
     *Returns*:
-        halo : array
+        halo : array or dict
             The catalog of halos
     """
 
@@ -152,21 +175,49 @@ def read_halo_catalog(catalog_loc):
 
     if path.isdir(catalog_loc[0]):
         dirname = catalog_loc[0]
-        catalog_loc = listdir(catalog_loc[0])
-        file_num = [int(f.rsplit(".")[-1]) for f in catalog_loc]
-        sort_index = np.argsort(file_num)
-        catalog_loc = [catalog_loc[i] for i in sort_index]
+        # order the files by their numerical suffix
+        catalog_loc = sorted(listdir(dirname), key=lambda f: int(f.rsplit(".", 1)[-1]))
         catalog_loc = [path.join(dirname, f) for f in catalog_loc]
 
     n_halos = np.fromfile(catalog_loc[0], catalog_header_dtype, 1)[0]["N_halos_total"]
-    halo = np.empty(n_halos, dtype=catalog_halo_dtype)
+    if columns is None:
+        halo = np.empty(n_halos, dtype=catalog_halo_dtype)
+    else:
+        halo = {name: np.empty(n_halos, dtype=catalog_halo_dtype[name]) for name in columns}
     print("Reading in {:d} halos...".format(n_halos))
 
-    n_halos = 0
-    for f in tqdm(catalog_loc):
-        with open(f, "rb") as fd:
-            n_halos_file = np.fromfile(fd, catalog_header_dtype, 1)[0]["N_halos_file"]
-            halo[n_halos : n_halos + n_halos_file] = np.fromfile(fd, catalog_halo_dtype, n_halos_file)
-        n_halos += n_halos_file
+    # read the (tiny) headers first to find where each file's halos belong
+    n_halos_file = [np.fromfile(f, catalog_header_dtype, 1)[0]["N_halos_file"] for f in catalog_loc]
+    offsets = np.concatenate(([0], np.cumsum(n_halos_file)))
+
+    def read_file(i_file):
+        if columns is not None:
+            # only gather the requested properties from the file
+            if n_halos_file[i_file] > 0:
+                src = np.memmap(
+                    catalog_loc[i_file],
+                    dtype=catalog_halo_dtype,
+                    mode="r",
+                    offset=catalog_header_dtype.itemsize,
+                    shape=(n_halos_file[i_file],),
+                )
+                for name in columns:
+                    halo[name][offsets[i_file] : offsets[i_file + 1]] = src[name]
+            return
+
+        # read the halos straight into their slice of the output array
+        dest = halo[offsets[i_file] : offsets[i_file + 1]].view(np.uint8)
+        with open(catalog_loc[i_file], "rb") as fd:
+            fd.seek(catalog_header_dtype.itemsize)
+            if fd.readinto(dest) != dest.size:
+                raise IOError("Unexpected end of file in %s" % catalog_loc[i_file])
+
+    # the reads release the GIL, so a few threads can keep the disk busy
+    with ThreadPoolExecutor(max_workers=min(8, len(catalog_loc))) as pool:
+        for _ in tqdm(pool.map(read_file, range(len(catalog_loc))), total=len(catalog_loc)):
+            pass
+
+    if columns is not None:
+        return halo
 
     return halo[list(catalog_halo_dtype.names[:-1])]
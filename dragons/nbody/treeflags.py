@@ -3,6 +3,8 @@
 
 """Tree flags from gbpTrees."""
 
+import numpy as np
+
 
 class TreeFlags:
     """
@@ -31,21 +33,29 @@ class TreeFlags:
                 if not line[0].startswith("//") and not line[1].startswith("TTTP"):
                     self.flags[line[1]] = 2 ** int(line[2][4:])
 
+        # the flag names and values in arrays, so that every flag can be tested at once
+        self._names = np.array(list(self.flags.keys()), dtype=object)
+        self._values = np.array(list(self.flags.values()), dtype=np.int64)
+
     def parse(self, num):
         """Parse a number as a combination of gbpTrees flags and return the string
         representation.
 
         Parameters
         ----------
-        num : int
+        num : int or ndarray
 
         Returns
         -------
-        flags : str
-            The parsed flags separated by '|'.
+        flags : str or ndarray
+            The parsed flags separated by '|' (an array of these strings with
+            the same shape as `num` if an array was passed).
         """
-        match = []
-        for s, v in list(self.flags.items()):
-            if (num & v) == v:
-                match.append(s)
-        return "|".join(match)
+        if np.ndim(num) == 0:
+            return "|".join(self._names[(num & self._values) == self._values])
+
+        # flag arrays typically contain only a handful of distinct values, so only parse each of those once
+        uniq, inverse = np.unique(num, return_inverse=True)
+        match = (uniq[:, None] & self._values) == self._values
+        parsed = np.array(["|".join(self._names[m]) for m in match], dtype=object)
+        return parsed[inverse].reshape(np.shape(num))
@@ -1,10 +1,5 @@
 import numpy as np
-from scipy import optimize as so
-from scipy.ndimage.filters import gaussian_filter
-
-
-def _find_confidence_interval(x, pdf, confidence_level):
-    return pdf[pdf > x].sum() - confidence_level
+from scipy.ndimage import gaussian_filter
 
 
 def density_contour(xdata, ydata, bins, ax, label=True, smooth=0.0, clabel_kwargs={}, **contour_kwargs):
@@ -49,7 +44,7 @@ def density_contour(xdata, ydata, bins, ax, label=True, smooth=0.0, clabel_kwarg
         nbins_x = bins[0]
         nbins_y = bins[1]
 
-    H, xedges, yedges = np.histogram2d(xdata, ydata, bins=bins, normed=True)
+    H, xedges, yedges = np.histogram2d(xdata, ydata, bins=bins, density=True)
     x_bin_sizes = (xedges[1:] - xedges[:-1]).reshape((1, nbins_x))
     y_bin_sizes = (yedges[1:] - yedges[:-1]).reshape((nbins_y, 1))
 
@@ -58,9 +53,12 @@ def density_contour(xdata, ydata, bins, ax, label=True, smooth=0.0, clabel_kwarg
     if smooth > 0:
         pdf = gaussian_filter(pdf, smooth)
 
-    one_sigma = so.brentq(_find_confidence_interval, 0.0, 1.0, args=(pdf, 0.39346934))
-    two_sigma = so.brentq(_find_confidence_interval, 0.0, 1.0, args=(pdf, 0.864664717))
-    three_sigma = so.brentq(_find_confidence_interval, 0.0, 1.0, args=(pdf, 0.988891003))
+    # The contour level enclosing a given probability is the pdf value at which
+    # the cumulative probability of the cells, taken from the densest down,
+    # first reaches it.
+    pdf_sorted = np.sort(pdf, axis=None)[::-1]
+    cumulative = np.cumsum(pdf_sorted)
+    three_sigma, two_sigma, one_sigma = pdf_sorted[np.searchsorted(cumulative, (0.988891003, 0.864664717, 0.39346934))]
     levels = [three_sigma, two_sigma, one_sigma]
 
     X, Y = 0.5 * (xedges[1:] + xedges[:-1]), 0.5 * (yedges[1:] + yedges[:-1])